@@ -1,15 +1,83 @@
-from crewai import Crew, Agent, Task
-from Models.llm import get_ollama_model
+from Models.llm import LLMBusyError, OllamaPool, count_tokens, get_ollama_pool, llm_limiter, stream_ollama
+from Agents.metrics import metrics, record_llm_call, span, timed
+from Agents.cache import make_cache_key, response_cache
+from Agents.memory import conversation_memory
+from Agents.semantic_cache import semantic_query_cache
+from Agents.prompts import (
+    CONTEXT_TEMPLATE,
+    INTENT_PROMPT,
+    PROFILE_FIELDS,
+    TASK_PROMPT,
+    clip_query,
+    encode_document_check,
+    encode_profile,
+    history_block,
+    prompt_budget,
+    record_prompt_size,
+)
+from Database.knowledge import FAQ_ANSWER_SIMILARITY, faq_knowledge_base, passage
+from Database.profile import StudentProfile
+from Agents.rules import MIN_MARKS
+from Agents.documents import (
+    ADMISSION_REQUIRED_DOCS,
+    LOAN_REQUIRED_DOCS,
+    check_from_missing,
+    document_ids,
+    document_labels,
+)
+from Agents.intent import (
+    INTENTS,
+    INTENT_CONFIDENCE_THRESHOLD,
+    intent_classifier,
+    record_intent_decision,
+)
+from collections import deque, namedtuple
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
+import os
+import threading
+import time
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load the Ollama3 LLM
-llm = get_ollama_model()
-
-def create_agent(name, role, goal):
+# Agent outputs kept on each officer for inspection; older ones are dropped
+CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "50"))
+
+# The LLM and CrewAI agents are built on first use, so importing this module
+# neither loads crewai nor needs Ollama to be up
+_llm = None
+_agents = {}
+# Reentrant: building an agent builds the LLM under the same lock
+_init_lock = threading.RLock()
+
+def get_llm():
+    """The shared LLM: the Ollama endpoint pool unless replaced with set_llm()."""
+    global _llm
+    if _llm is None:
+        with _init_lock:
+            if _llm is None:
+                _llm = get_ollama_pool()
+                metrics.register_info("llm_endpoints", _llm.stats)
+    return _llm
+
+def set_llm(llm):
+    """Replaces the shared LLM (e.g. with an offline stand-in); agents built on the old one are dropped."""
+    global _llm
+    with _init_lock:
+        _llm = llm
+        _agents.clear()
+
+def create_agent(name, role, goal, llm=None):
+    from crewai import Agent
+
+    llm = llm or get_llm()
+    if isinstance(llm, OllamaPool):
+        # A CrewAI agent is bound to one LLM; pooled crews get theirs through get_agent(key, endpoint)
+        llm = llm.endpoints[0].llm()
     return Agent(
         role=role,
         goal=goal,
@@ -19,122 +87,127 @@ def create_agent(name, role, goal):
     )
 
 # Define all agents
-shortlisting_agent = create_agent(
-    name="Shortlisting Agent",
-    role="Admission Eligibility Verifier",
-    goal="Evaluate the student's eligibility for admission based on academic performance and criteria."
-)
-
-document_checker_agent = create_agent(
-    name="Document Checker Agent",
-    role="Document Validator",
-    goal="Verify if the submitted documents are complete and valid for the admission process."
-)
-
-student_counsellor_agent = create_agent(
-    name="Student Counsellor",
-    role="Admission Guidance Expert",
-    goal="Guide students about the admission process, course offerings, and counseling."
-)
-
-student_loan_agent = create_agent(
-    name="Student Loan Agent",
-    role="Student Loan Advisor",
-    goal="Assist students in understanding and applying for student loans."
-)
+AgentSpec = namedtuple("AgentSpec", ["name", "role", "goal"])
+
+AGENT_SPECS = {
+    "shortlisting": AgentSpec(
+        name="Shortlisting Agent",
+        role="Admission Eligibility Verifier",
+        goal="Evaluate the student's eligibility for admission based on academic performance and criteria."
+    ),
+    "document": AgentSpec(
+        name="Document Checker Agent",
+        role="Document Validator",
+        goal="Verify if the submitted documents are complete and valid for the admission process."
+    ),
+    "counsellor": AgentSpec(
+        name="Student Counsellor",
+        role="Admission Guidance Expert",
+        goal="Guide students about the admission process, course offerings, and counseling."
+    ),
+    "loan": AgentSpec(
+        name="Student Loan Agent",
+        role="Student Loan Advisor",
+        goal="Assist students in understanding and applying for student loans."
+    ),
+}
+
+def get_agent(key, endpoint=None):
+    # With a pool, each endpoint gets its own copy of the agent
+    cache_key = key if endpoint is None else (key, endpoint.url)
+    agent = _agents.get(cache_key)
+    if agent is None:
+        spec = AGENT_SPECS[key]
+        with _init_lock:
+            agent = _agents.get(cache_key)
+            if agent is None:
+                agent = create_agent(spec.name, spec.role, spec.goal, endpoint.llm() if endpoint else None)
+                _agents[cache_key] = agent
+    return agent
+
+class LazyAgents(Mapping):
+    """Agent key -> CrewAI agent, creating each shared agent the first time it is looked up."""
+
+    def __getitem__(self, key):
+        if key not in AGENT_SPECS:
+            raise KeyError(key)
+        return get_agent(key)
+
+    def __iter__(self):
+        return iter(AGENT_SPECS)
+
+    def __len__(self):
+        return len(AGENT_SPECS)
+
+def default_agents():
+    return LazyAgents()
 
 def create_task(context, agent, expected_output):
+    from crewai import Task
+
     return Task(
         description=context,
         agent=agent,
         expected_output=expected_output
     )
 
-def extract_student_info(data):
+def extract_student_info(profile):
     return {
-        "10th Marks": float(data.get("marks_10th", 0)),
-        "12th Marks": float(data.get("marks_12th", 0))
+        "10th Marks": profile.marks_10th,
+        "12th Marks": profile.marks_12th
     }
 
-def extract_submitted_docs(data):
-    return data.get("documents_submitted", []) or []
-
-class AdmissionOfficer:
-    def __init__(self):
-        self.agents = {
-            "shortlisting": shortlisting_agent,
-            "document": document_checker_agent,
-            "counsellor": student_counsellor_agent,
-            "loan": student_loan_agent
-        }
-        self.chat_history = []
+def extract_submitted_docs(profile):
+    # Canonical ids of the submitted documents, the income certificate flag counts as one
+    ids = document_ids(profile.documents_submitted)
+    if profile.income_certificate:
+        ids = ids | {"income_certificate"}
+    return ids
+
+# Agent to run, task description and expected output for one query; `rendered` is the
+# template answer for intents whose verdict is fully decided in Python, `prefix` the
+# checklist part of it that can be shown before the model's reply, `history` the
+# student's recent conversation (added by with_history for plans that reach the model,
+# trimmed to the intent's prompt budget by fit_plan)
+ResponsePlan = namedtuple(
+    "ResponsePlan",
+    ["agent_key", "context", "expected_output", "rendered", "prefix", "history"],
+    defaults=[None, None, None]
+)
 
-    def classify_intent(self, query):
-        prompt = f"""
-        Classify the following student query into one of the following categories:
-        - eligibility
-        - loan
-        - document
-        - counselling
+# Appended to streamed prompts whose check summary is sent ahead of the model output
+PREFIX_SHOWN_NOTE = "\n\nThe check summary above has already been shown to the student; do not repeat it."
 
-        Only respond with the category name.
 
-        Query: "{query}"
-        """
-        intent = llm.call(prompt).strip().lower()
-        if intent not in ["eligibility", "loan", "document", "counselling"]:
-            intent = "unknown"
-        logger.info(f"[DEBUG] Detected intent: {intent}")
-        return intent
+LLM_BUSY_REPLY = "⏳ The helpdesk is handling a lot of questions right now. Please try again in a minute."
 
-    def validate_input(self, student_data):
-        required_fields = ["name", "age", "course_applied", "marks_10th", "marks_12th"]
-        for field in required_fields:
-            if field not in student_data or student_data[field] in [None, ""]:
-                return False, f"Missing or invalid field: {field}"
-        return True, None
+UNKNOWN_INTENT_REPLY = "❓ Sorry, I couldn't understand your request. Could you rephrase it or choose a category like eligibility, loan, documents, or counselling?"
 
-    def log_agent_output(self, agent_name, output):
-        logger.info(f"[AGENT OUTPUT - {agent_name}]:\n{output}")
-        self.chat_history.append((agent_name, output))
+# Answer loan/document queries straight from templates unless disabled
+DETERMINISTIC_RESPONSES = os.getenv("DETERMINISTIC_RESPONSES", "1") != "0"
+TEMPLATE_INTENTS = ("loan", "document")
 
-    def process_query(self, query, student_data):
-        valid, error_msg = self.validate_input(student_data)
-        if not valid:
-            return f"⚠️ Error: {error_msg}. Please provide complete and correct student information."
+# Background workers for optional LLM polish of template answers
+_polish_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("POLISH_WORKERS", "2")),
+    thread_name_prefix="polish"
+)
 
-        tasks = []
-        student_name = student_data['name']
-
-        context = f"""
-        STUDENT PROFILE:
-        Name: {student_name}
-        Age: {student_data['age']}
-        Course Applied: {student_data['course_applied']}
-        Documents Submitted: {", ".join(student_data.get('documents_submitted', []))}
-        Loan Requested: ₹{student_data.get('loan_requested', 0)}
-        Income Certificate: {"Yes" if student_data.get('income_certificate') else "No"}
-        Marks (10th): {student_data['marks_10th']}%
-        Marks (12th): {student_data['marks_12th']}%
-
-        STUDENT QUERY:
-        {query}
-        """
+# Workers answering the extra intents of compound questions alongside the calling thread
+_branch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BRANCH_WORKERS", "8")),
+    thread_name_prefix="branch"
+)
 
-        intent = self.classify_intent(query)
+# Section headings when one reply answers several intents
+INTENT_HEADINGS = {
+    "eligibility": "Eligibility",
+    "loan": "Student loan",
+    "document": "Documents",
+    "counselling": "Guidance",
+}
 
-        if intent == "eligibility":
-            tasks.append(create_task(
-                context,
-                self.agents["shortlisting"],
-                "Bullet-pointed evaluation of admission eligibility."
-            ))
-        
-        elif intent == "loan":
-            if not student_data.get("income_certificate"):
-                keywords = ["apply", "submit", "get", "eligible", "loan"]
-                if any(word in query.lower() for word in keywords):
-                    return f"""
+LOAN_INCOME_CERTIFICATE_LETTER = """
 Dear {student_name},
 
 Thank you for your interest in applying for a student loan. Please note that the Income Certificate is a mandatory requirement for processing any student loan application.
@@ -145,52 +218,7 @@ Sincerely,
 Admissions & Finance Office
 """
 
-            student = extract_student_info(student_data)
-            submitted_docs = extract_submitted_docs(student_data)
-
-            if student_data.get("income_certificate"):
-                submitted_docs.append("Income Certificate")
-
-            loan_criteria_ok = (
-                student["10th Marks"] >= 50 and
-                student["12th Marks"] >= 50
-            )
-
-            required_loan_docs = [
-                "10th Marksheet",
-                "12th Marksheet",
-                "Aadhar Card",
-                "Photo",
-                "Income Certificate"
-            ]
-
-            def is_doc_submitted(doc_name, docs):
-                norm = lambda s: s.lower().replace(" ", "").replace("marksheet", "")
-                doc_name_norm = norm(doc_name)
-                return any(doc_name_norm in norm(d) for d in docs)
-
-            missing_docs = [doc for doc in required_loan_docs if not is_doc_submitted(doc, submitted_docs)]
-            doc_check_ok = len(missing_docs) == 0
-
-            loan_context = f"""
-LOAN ELIGIBILITY CHECK:
-To qualify for a student loan, the following are required:
-- Minimum 50% marks in 10th and 12th
-- Submission of: {", ".join(required_loan_docs)}
-
-STUDENT PERFORMANCE:
-- 10th Marks: {student['10th Marks']}% {"✅" if student['10th Marks'] >= 50 else "❌"}
-- 12th Marks: {student['12th Marks']}% {"✅" if student['12th Marks'] >= 50 else "❌"}
-
-DOCUMENT CHECK:
-""" + "\n".join([
-                f"- {'✅' if is_doc_submitted(doc, submitted_docs) else '❌'} {doc}: {'Submitted' if is_doc_submitted(doc, submitted_docs) else 'Missing'}"
-                for doc in required_loan_docs
-            ])
-
-            if loan_criteria_ok and doc_check_ok:
-                result = "🎉 Loan Eligibility Status: Eligible for Student Loan"
-                closing = f"""
+LOAN_APPROVED_LETTER = """
 
 Dear {student_name},
 
@@ -200,16 +228,8 @@ If you have any questions, feel free to reach out. We wish you all the best as y
 
 Sincerely,  
 Admissions & Finance Office"""
-            else:
-                result = "❌ Loan Eligibility Status: Not Eligible\n📌 Issues:\n"
-                if not loan_criteria_ok:
-                    if student["10th Marks"] < 50:
-                        result += "- 10th marks are below 50%\n"
-                    if student["12th Marks"] < 50:
-                        result += "- 12th marks are below 50%\n"
-                if not doc_check_ok:
-                    result += "- Missing documents: " + ", ".join(missing_docs)
-                closing = f"""
+
+LOAN_REJECTED_LETTER = """
 
 Dear {student_name},
 
@@ -220,55 +240,7 @@ If you need support or clarification, our team is always here to assist you. We
 Sincerely,  
 Admissions & Finance Office"""
 
-            tasks.append(create_task(
-                loan_context,
-                self.agents["loan"],
-                f"""Loan Eligibility Summary:
-- ✅ or ❌ for marks and documents
-- 📌 Mention all issues if not eligible
-- End with final loan eligibility status
-
-{result}{closing}"""
-            ))
-
-        elif intent == "document":
-            def is_doc_submitted(doc_name, submitted_docs):
-                norm = lambda s: s.lower().replace(" ", "").replace("marksheet", "")
-                doc_name_norm = norm(doc_name)
-                return any(doc_name_norm in norm(d) for d in submitted_docs)
-
-            submitted_docs = extract_submitted_docs(student_data)
-
-            context += f"""
-DOCUMENT VALIDATION RULES:
-The following documents are mandatory to approve admission:
-- 10th Marksheet
-- 12th Marksheet
-- Aadhar Card
-- Photo
-
-DOCUMENT CHECK SUMMARY:
-- {"✅" if is_doc_submitted("10th Marksheet", submitted_docs) else "❌"} 10th Marksheet: {"Submitted" if is_doc_submitted("10th Marksheet", submitted_docs) else "Missing"}
-- {"✅" if is_doc_submitted("12th Marksheet", submitted_docs) else "❌"} 12th Marksheet: {"Submitted" if is_doc_submitted("12th Marksheet", submitted_docs) else "Missing"}
-- {"✅" if is_doc_submitted("Aadhar Card", submitted_docs) else "❌"} Aadhar Card: {"Submitted" if is_doc_submitted("Aadhar Card", submitted_docs) else "Missing"}
-- {"✅" if is_doc_submitted("Photo", submitted_docs) else "❌"} Photo: {"Submitted" if is_doc_submitted("Photo", submitted_docs) else "Missing"}
-- {"⚠️ Transfer Certificate: Not Uploaded (not applicable)" if not is_doc_submitted("Transfer Certificate", submitted_docs) else "✅ Transfer Certificate: Submitted"}
-"""
-
-            all_required_present = all([
-                is_doc_submitted("10th Marksheet", submitted_docs),
-                is_doc_submitted("12th Marksheet", submitted_docs),
-                is_doc_submitted("Aadhar Card", submitted_docs),
-                is_doc_submitted("Photo", submitted_docs)
-            ])
-
-            final_status = (
-                "✅ Admission Status: Approved 🎉" if all_required_present else
-                "❌ Admission Status: Not Approved\n🔁 Action Required: Please upload missing documents to proceed"
-            )
-
-            if all_required_present:
-                closing_note = f"""
+DOCUMENTS_APPROVED_LETTER = """
 
 Dear {student_name},
 
@@ -278,8 +250,8 @@ Should anything further be required, we will reach out to you.
 
 Sincerely,  
 Admissions Committee"""
-            else:
-                closing_note = f"""
+
+DOCUMENTS_PENDING_LETTER = """
 
 Dear {student_name},
 
@@ -290,28 +262,698 @@ For any help or guidance, please don’t hesitate to contact our support team.
 Sincerely,  
 Admissions Committee"""
 
-            tasks.append(create_task(
-                context,
-                self.agents["document"],
-                f"""Document Verification Summary:
-- ✅ or ❌ for required documents
-- ⚠️ for Transfer Certificate if not uploaded
-- End with final admission status message
+class AdmissionOfficer:
+    def __init__(self, intent_threshold=None, deterministic=None, polish=False, cache=response_cache, agents=None,
+                 memory=conversation_memory, knowledge=faq_knowledge_base, semantic_cache=semantic_query_cache):
+        # Agents (and the LLM behind them) are shared; pass `agents` to reuse a set held elsewhere
+        self.agents = agents or default_agents()
+        self.chat_history = deque(maxlen=CHAT_HISTORY_LIMIT)
+        self.intent_threshold = (
+            INTENT_CONFIDENCE_THRESHOLD if intent_threshold is None else intent_threshold
+        )
+        self.deterministic = DETERMINISTIC_RESPONSES if deterministic is None else deterministic
+        self.polish = polish
+        # Pass cache=None to always recompute answers
+        self.cache = cache
+        # {"time_to_first_token", "total"} in seconds for the last streamed answer
+        self.last_stream_timing = None
+        # Per-student conversation memory; pass memory=None to answer every query in isolation
+        self.memory = memory
+        # FAQ passages for counselling queries; pass knowledge=None to skip retrieval
+        self.knowledge = knowledge
+        # Answers to earlier, similarly worded questions; pass semantic_cache=None to disable
+        self.semantic_cache = semantic_cache
+
+    def classify_intents(self, query):
+        """Every intent a compound question clearly asks about, else [classify_intent(query)]."""
+        intents, confidence = self.local_intents(query)
+        return intents or [self.classify_fallback(query, confidence)]
+
+    async def aclassify_intents(self, query):
+        intents, confidence = self.local_intents(query)
+        return intents or [await self.aclassify_fallback(query, confidence)]
+
+    @timed("classify_intent")
+    def local_intents(self, query):
+        """(intents, confidence) from the local classifier alone; intents is None when it is unsure."""
+        intents = self.compound_intents(query)
+        if intents:
+            return intents, None
+        intent, confidence = self.classify_locally(query)
+        return ([intent] if intent is not None else None), confidence
+
+    def compound_intents(self, query):
+        intents = intent_classifier.classify_all(query)
+        if len(intents) < 2:
+            return None
+        record_intent_decision(fallback=False)
+        metrics.increment("compound_queries")
+        logger.info(f"[DEBUG] Detected intents (local): {', '.join(intents)}")
+        return intents
+
+    @timed("classify_intent")
+    def classify_intent(self, query):
+        intent, confidence = self.classify_locally(query)
+        if intent is not None:
+            return intent
+        return self.classify_fallback(query, confidence)
+
+    async def aclassify_intent(self, query):
+        with span("classify_intent"):
+            intent, confidence = self.classify_locally(query)
+            if intent is not None:
+                return intent
+            return await self.aclassify_fallback(query, confidence)
+
+    def classify_fallback(self, query, confidence, neighbour=None):
+        # The local classifier was unsure: reuse a similar question's intent, else ask the LLM
+        intent = self.classify_from_similar(query, neighbour)
+        if intent is not None:
+            return intent
+
+        prompt = self.intent_prompt(query)
+        with llm_limiter.slot(), span("llm.intent"):
+            reply = get_llm().call(prompt)
+        record_llm_call("intent", count_tokens(prompt), count_tokens(reply))
+        return self.parse_llm_intent(reply, confidence)
+
+    async def aclassify_fallback(self, query, confidence, neighbour=None):
+        intent = await asyncio.to_thread(self.classify_from_similar, query, neighbour)
+        if intent is not None:
+            return intent
+
+        prompt = self.intent_prompt(query)
+        async with llm_limiter.aslot():
+            with span("llm.intent"):
+                reply = await asyncio.to_thread(lambda: get_llm().call(prompt))
+        record_llm_call("intent", count_tokens(prompt), count_tokens(reply))
+        return self.parse_llm_intent(reply, confidence)
+
+    def classify_locally(self, query):
+        # Fast path: local keyword classifier, only defer to the LLM when unsure
+        intent, confidence = intent_classifier.classify(query)
+        if intent != "unknown" and confidence >= self.intent_threshold:
+            record_intent_decision(fallback=False)
+            logger.info(f"[DEBUG] Detected intent (local, confidence={confidence}): {intent}")
+            return intent, confidence
+
+        record_intent_decision(fallback=True)
+        return None, confidence
+
+    def classify_from_similar(self, query, neighbour=None):
+        # Second fast path: reuse the intent of a near-identical earlier question; `neighbour` is
+        # the nearest one found by lookup_similar, so the query isn't embedded a second time
+        if self.semantic_cache is None:
+            return None
+        if neighbour is not None:
+            intent = self.semantic_cache.intent_of(neighbour)
+        else:
+            intent = self.semantic_cache.lookup_intent(query)
+        if intent not in INTENTS:
+            return None
+        logger.info(f"[DEBUG] Detected intent (similar query): {intent}")
+        return intent
 
-{final_status}{closing_note}"""
-            ))
+    def intent_prompt(self, query):
+        prompt = INTENT_PROMPT.render(intents=", ".join(INTENTS), query=clip_query(query))
+        record_prompt_size("intent", count_tokens(prompt))
+        return prompt
 
-        elif intent == "counselling":
-            tasks.append(create_task(
+    def parse_llm_intent(self, reply, confidence):
+        intent = reply.strip().lower()
+        if intent not in INTENTS:
+            intent = "unknown"
+        logger.info(f"[DEBUG] Detected intent (llm, local confidence={confidence}): {intent}")
+        return intent
+
+    def validate_input(self, student_data):
+        required_fields = ["name", "age", "course_applied", "marks_10th", "marks_12th"]
+        is_profile = isinstance(student_data, StudentProfile)
+        for field in required_fields:
+            value = getattr(student_data, field) if is_profile else student_data.get(field)
+            if value in [None, ""]:
+                return False, f"Missing or invalid field: {field}"
+        return True, None
+
+    def log_agent_output(self, agent_name, output):
+        logger.info(f"[AGENT OUTPUT - {agent_name}]:\n{output}")
+        self.chat_history.append((agent_name, output))
+
+    def build_context(self, query, student_data, intent=None):
+        # Only the profile facts this intent needs, one line instead of a block per field
+        fields = PROFILE_FIELDS.get(intent)
+        profile = encode_profile(student_data, fields) if fields else encode_profile(student_data)
+        return CONTEXT_TEMPLATE.render(profile=profile, query=clip_query(query))
+
+    def remember_turn(self, student_data, query, answer):
+        if self.memory is not None:
+            self.memory.add_exchange(student_data.student_id, query, answer)
+
+    @timed("plan_response")
+    def plan_response(self, intent, query, student_data):
+        context = self.build_context(query, student_data, intent)
+
+        if intent == "eligibility":
+            plan = ResponsePlan(
+                "shortlisting",
                 context,
-                self.agents["counsellor"],
-                "Bullet-pointed advice and next steps for the student."
-            ))
+                "Bullet-pointed evaluation of admission eligibility."
+            )
+        elif intent == "loan":
+            plan = self.plan_loan_response(query, student_data)
+        elif intent == "document":
+            plan = self.plan_document_response(context, student_data)
+        elif intent == "counselling":
+            plan = self.plan_counselling_response(query, context)
+        else:
+            return None
+        return plan
+
+    def with_history(self, plan, student_data):
+        # Only plans going to the model read the conversation; template answers never need it
+        if self.memory is None:
+            return plan
+        return plan._replace(history=self.memory.context(student_data.student_id))
+
+    def search_knowledge(self, query):
+        if self.knowledge is None:
+            return []
+        try:
+            return self.knowledge.search(query)
+        except Exception as e:
+            # No grounding is better than no answer
+            logger.warning(f"[FAQ] Search failed: {e}")
+            return []
+
+    def plan_counselling_response(self, query, context):
+        matches = self.search_knowledge(query)
+        best = matches[0] if matches else None
+        if best is not None and best.answer and best.similarity >= FAQ_ANSWER_SIMILARITY:
+            # Close paraphrase of a stored question: its answer needs no model call
+            logger.info(f"[FAQ] Answered from {best.id} (similarity={best.similarity})")
+            metrics.increment("faq_answers")
+            return ResponsePlan("counsellor", None, None, best.answer)
+
+        if matches:
+            context += "\nREFERENCE:\n" + "\n".join(f"- {passage(match)}" for match in matches)
+        return ResponsePlan(
+            "counsellor",
+            context,
+            "Bullet-pointed advice and next steps for the student."
+            + (" Base facts on the reference and do not invent any." if matches else "")
+        )
+
+    def fit_plan(self, intent, plan):
+        """
+        Fits the plan into the intent's prompt budget and logs the prompt size.
+
+        Task context and expected output are kept whole; the conversation
+        history gets whatever budget is left, oldest lines dropped first.
+        """
+        spec = AGENT_SPECS[plan.agent_key]
+        base_tokens = TASK_PROMPT.size(
+            role=spec.role, goal=spec.goal, history="", context=plan.context.strip(),
+            expected_output=plan.expected_output
+        )
+        history = history_block(plan.history, prompt_budget(intent) - base_tokens)
+        record_prompt_size(intent, base_tokens + count_tokens(history))
+        return plan._replace(history=history)
+
+    def plan_loan_response(self, query, student_data):
+        student_name = student_data.name
+
+        if not student_data.income_certificate:
+            keywords = ["apply", "submit", "get", "eligible", "loan"]
+            if any(word in query.lower() for word in keywords):
+                # Nothing for the model to add: the loan cannot proceed without the certificate
+                return ResponsePlan("loan", None, None, LOAN_INCOME_CERTIFICATE_LETTER.format(student_name=student_name))
+
+        student = extract_student_info(student_data)
+        # Verdicts were computed when the profile was saved
+        eligibility = student_data.eligibility
+        doc_check = check_from_missing(eligibility.loan_missing_documents, LOAN_REQUIRED_DOCS)
+
+        loan_criteria_ok = eligibility.marks_ok
+        missing_docs = doc_check.missing
+
+        # Prompt gets the facts and verdict in one compact block; the checklist below is for display
+        prompt_context = (
+            f"LOAN RULES: at least {MIN_MARKS}% in 10th and 12th; documents: {', '.join(document_labels(LOAN_REQUIRED_DOCS))}\n"
+            f"CHECK: 10th {student['10th Marks']}% ({'ok' if eligibility.marks_10th_ok else 'below'}); "
+            f"12th {student['12th Marks']}% ({'ok' if eligibility.marks_12th_ok else 'below'}); "
+            f"{encode_document_check(doc_check)}"
+        )
+
+        loan_context = f"""
+LOAN ELIGIBILITY CHECK:
+To qualify for a student loan, the following are required:
+- Minimum {MIN_MARKS}% marks in 10th and 12th
+- Submission of: {", ".join(document_labels(LOAN_REQUIRED_DOCS))}
+
+STUDENT PERFORMANCE:
+- 10th Marks: {student['10th Marks']}% {"✅" if eligibility.marks_10th_ok else "❌"}
+- 12th Marks: {student['12th Marks']}% {"✅" if eligibility.marks_12th_ok else "❌"}
+
+DOCUMENT CHECK:
+""" + "\n".join([
+            f"- {'✅' if submitted else '❌'} {doc}: {'Submitted' if submitted else 'Missing'}"
+            for doc, submitted in doc_check.items
+        ])
+
+        if loan_criteria_ok and doc_check.complete:
+            result = "🎉 Loan Eligibility Status: Eligible for Student Loan"
+            closing = LOAN_APPROVED_LETTER.format(student_name=student_name)
+        else:
+            result = "❌ Loan Eligibility Status: Not Eligible\n📌 Issues:\n"
+            if not loan_criteria_ok:
+                if not eligibility.marks_10th_ok:
+                    result += f"- 10th marks are below {MIN_MARKS}%\n"
+                if not eligibility.marks_12th_ok:
+                    result += f"- 12th marks are below {MIN_MARKS}%\n"
+            if not doc_check.complete:
+                result += "- Missing documents: " + ", ".join(missing_docs)
+            closing = LOAN_REJECTED_LETTER.format(student_name=student_name)
+
+        expected_output = f"""Loan Eligibility Summary:
+- ✅ or ❌ for marks and documents
+- 📌 Mention all issues if not eligible
+- End with: {result.splitlines()[0]}
+- Close with a short note to {student_name} from the Admissions & Finance Office"""
+
+        return ResponsePlan(
+            "loan",
+            prompt_context,
+            expected_output,
+            f"{loan_context.strip()}\n\n{result}{closing}",
+            loan_context.strip()
+        )
+
+    def plan_document_response(self, context, student_data):
+        student_name = student_data.name
+
+        submitted_ids = extract_submitted_docs(student_data)
+        doc_check = check_from_missing(student_data.eligibility.missing_documents, ADMISSION_REQUIRED_DOCS)
+
+        check_lines = [
+            f"- {'✅' if submitted else '❌'} {doc}: {'Submitted' if submitted else 'Missing'}"
+            for doc, submitted in doc_check.items
+        ]
+        if "transfer_certificate" in submitted_ids:
+            check_lines.append("- ✅ Transfer Certificate: Submitted")
+        else:
+            check_lines.append("- ⚠️ Transfer Certificate: Not Uploaded (not applicable)")
+        check_summary = "DOCUMENT CHECK SUMMARY:\n" + "\n".join(check_lines) + "\n"
+
+        transfer_status = "submitted" if "transfer_certificate" in submitted_ids else "not uploaded (not applicable)"
+        context += (
+            f"\nREQUIRED DOCUMENTS: {', '.join(document_labels(ADMISSION_REQUIRED_DOCS))}\n"
+            f"CHECK: {encode_document_check(doc_check)}; transfer certificate: {transfer_status}"
+        )
+
+        all_required_present = doc_check.complete
 
+        final_status = (
+            "✅ Admission Status: Approved 🎉" if all_required_present else
+            "❌ Admission Status: Not Approved\n🔁 Action Required: Please upload missing documents to proceed"
+        )
+
+        if all_required_present:
+            closing_note = DOCUMENTS_APPROVED_LETTER.format(student_name=student_name)
         else:
-            return f"❓ Sorry, I couldn't understand your request. Could you rephrase it or choose a category like eligibility, loan, documents, or counselling?"
+            closing_note = DOCUMENTS_PENDING_LETTER.format(student_name=student_name)
 
-        crew = Crew(tasks=tasks)
-        result = crew.kickoff()
+        expected_output = f"""Document Verification Summary:
+- ✅ or ❌ for required documents
+- ⚠️ for Transfer Certificate if not uploaded
+- End with: {final_status.splitlines()[0]}
+- Close with a short note to {student_name} from the Admissions Committee"""
+
+        return ResponsePlan(
+            "document",
+            context,
+            expected_output,
+            f"{check_summary}\n{final_status}{closing_note}",
+            check_summary.strip()
+        )
+
+    def run_plan(self, intent, plan):
+        with llm_limiter.slot():
+            return self.kickoff_plan(intent, plan)
+
+    async def arun_plan(self, intent, plan):
+        async with llm_limiter.aslot():
+            return await asyncio.to_thread(self.kickoff_plan, intent, plan)
+
+    def kickoff_plan(self, intent, plan):
+        llm = get_llm()
+        if isinstance(llm, OllamaPool) and isinstance(self.agents, LazyAgents):
+            # Run the crew on the least loaded endpoint, with that endpoint's agent
+            with llm.lease() as endpoint:
+                return self.kickoff_crew(intent, plan, get_agent(plan.agent_key, endpoint))
+        return self.kickoff_crew(intent, plan, self.agents[plan.agent_key])
+
+    def kickoff_crew(self, intent, plan, agent):
+        from crewai import Crew
+
+        plan = self.fit_plan(intent, plan)
+        description = f"{plan.history}{plan.context.strip()}"
+        task = create_task(description, agent, plan.expected_output)
+        crew = Crew(tasks=[task])
+        with span(f"llm.crew.{intent}"):
+            result = crew.kickoff()
+        record_llm_call("crew", count_tokens(description) + count_tokens(plan.expected_output), count_tokens(str(result)))
         self.log_agent_output(intent, result)
         return result
+
+    def polish_async(self, intent, plan, student_data, callback=None):
+        """
+        Rewrites a template-rendered verdict through the LLM in the background.
+
+        Returns a Future resolving to the polished text; `callback`, if given,
+        is called with that text once the crew finishes.
+        """
+        future = _polish_executor.submit(lambda: self.run_plan(intent, self.with_history(plan, student_data)))
+
+        def _done(f):
+            if f.exception() is not None:
+                logger.warning(f"[POLISH] {intent} polish failed: {f.exception()}")
+            elif callback is not None:
+                callback(f.result())
+
+        future.add_done_callback(_done)
+        return future
+
+    @timed("process_query")
+    def process_query(self, query, student_data, on_polished=None):
+        valid, error_msg = self.validate_input(student_data)
+        if not valid:
+            return f"⚠️ Error: {error_msg}. Please provide complete and correct student information."
+        student_data = StudentProfile.from_dict(student_data)
+
+        intents, confidence = self.local_intents(query)
+        neighbour = None
+        if self.wants_similar(intents):
+            similar, neighbour = self.lookup_similar(query, student_data, intents)
+            if similar is not None:
+                self.remember_turn(student_data, query, similar)
+                return similar
+        if intents is None:
+            intents = [self.classify_fallback(query, confidence, neighbour)]
+
+        if len(intents) > 1:
+            result = "\n\n".join(section for _, section in self.iter_sections(intents, query, student_data))
+            self.remember_turn(student_data, query, result)
+            return result
+
+        intent = intents[0]
+        cache_key, cached = self.lookup_cached(intent, query, student_data)
+        if cached is not None:
+            self.remember_turn(student_data, query, cached)
+            return cached
+
+        result = self.answer(intent, query, student_data, on_polished)
+        self.store_answer(cache_key, intent, query, student_data, result)
+        self.remember_turn(student_data, query, result)
+        return result
+
+    def lookup_cached(self, intent, query, student_data):
+        """Returns (cache_key, cached answer or None); the key is None when the answer must not be cached."""
+        if intent not in INTENTS or self.cache is None:
+            return None, None
+
+        with span("cache_lookup"):
+            cache_key = make_cache_key(intent, student_data, query)
+            cached = self.cache.get(cache_key)
+        metrics.increment("cache_lookups", 1, "miss" if cached is None else "hit")
+        if cached is not None:
+            logger.info(f"[CACHE] Hit for {intent} query from {student_data.name}")
+        return cache_key, cached
+
+    def answered_from_template(self, intent):
+        # Loan/document verdicts render in microseconds, faster than embedding the query
+        return self.deterministic and intent in TEMPLATE_INTENTS
+
+    def wants_similar(self, intents):
+        """Whether a near-duplicate's answer is worth an embedding round trip before answering."""
+        if self.semantic_cache is None:
+            return False
+        # Unsure intent (it would go to the LLM), or a single intent whose answer needs the LLM;
+        # compound answers are assembled from per-intent parts instead
+        return intents is None or (len(intents) == 1 and not self.answered_from_template(intents[0]))
+
+    def lookup_similar(self, query, student_data, intents=None):
+        """
+        (answer given to a near-duplicate of `query` for this same profile or None,
+        the nearest past question as a SemanticHit or None if none was looked up).
+        """
+        if self.semantic_cache is None:
+            return None, None
+        hit = self.semantic_cache.lookup(query, student_data)
+        if hit is None or hit.answer is None or hit.intent not in INTENTS:
+            return None, hit
+        # Worded alike but classified differently: not the same question
+        if intents is not None and hit.intent not in intents:
+            return None, hit
+        logger.info(f"[CACHE] Similar-query hit ({hit.similarity}) for {hit.intent} query from {student_data.name}")
+        return hit.answer, hit
+
+    def answer_branch(self, intent, query, student_data):
+        """One intent's part of a compound answer, through the response cache."""
+        cache_key, cached = self.lookup_cached(intent, query, student_data)
+        if cached is not None:
+            return cached
+        # No polish callback: a polished part would replace the whole reply
+        result = self.answer(intent, query, student_data)
+        if cache_key is not None:
+            self.cache.set(cache_key, result)
+        return result
+
+    async def aanswer_branch(self, intent, query, student_data):
+        cache_key, cached = self.lookup_cached(intent, query, student_data)
+        if cached is not None:
+            return cached
+        result = await self.aanswer(intent, query, student_data)
+        if cache_key is not None:
+            self.cache.set(cache_key, result)
+        return result
+
+    def format_section(self, intent, answer):
+        return f"**{INTENT_HEADINGS[intent]}**\n\n{answer}"
+
+    def iter_sections(self, intents, query, student_data):
+        """
+        Answers every intent of a compound question concurrently.
+
+        The first intent is answered in the calling thread and the rest on
+        the branch executor, so LLM-backed parts are in flight together and
+        the whole reply takes about as long as its slowest part. Yields
+        (intent, section) in the order of `intents`.
+        """
+        with span("compound_answer"):
+            futures = [
+                _branch_executor.submit(self.answer_branch, intent, query, student_data)
+                for intent in intents[1:]
+            ]
+            yield intents[0], self.format_section(intents[0], self.answer_branch(intents[0], query, student_data))
+            for intent, future in zip(intents[1:], futures):
+                yield intent, self.format_section(intent, future.result())
+
+    async def aanswer_compound(self, intents, query, student_data):
+        with span("compound_answer"):
+            answers = await asyncio.gather(
+                *(self.aanswer_branch(intent, query, student_data) for intent in intents)
+            )
+        return "\n\n".join(self.format_section(intent, answer) for intent, answer in zip(intents, answers))
+
+    def store_answer(self, cache_key, intent, query, student_data, result):
+        if cache_key is not None:
+            self.cache.set(cache_key, result)
+        if self.semantic_cache is not None and intent in INTENTS and not self.answered_from_template(intent):
+            self.semantic_cache.store(query, student_data, intent, result)
+
+    async def aprocess_query(self, query, student_data, on_polished=None, raise_busy=False):
+        """
+        Async counterpart of process_query for serving many students from one event loop.
+
+        LLM calls run in worker threads behind the shared llm_limiter, so at
+        most OLLAMA_MAX_CONCURRENCY reach Ollama at once; a query that cannot
+        get a slot within OLLAMA_QUEUE_TIMEOUT gets a busy reply instead, or
+        raises LLMBusyError if `raise_busy` is set.
+        """
+        valid, error_msg = self.validate_input(student_data)
+        if not valid:
+            return f"⚠️ Error: {error_msg}. Please provide complete and correct student information."
+        student_data = StudentProfile.from_dict(student_data)
+
+        with span("aprocess_query"):
+            intents, confidence = self.local_intents(query)
+            neighbour = None
+            if self.wants_similar(intents):
+                similar, neighbour = await asyncio.to_thread(self.lookup_similar, query, student_data, intents)
+                if similar is not None:
+                    await asyncio.to_thread(self.remember_turn, student_data, query, similar)
+                    return similar
+
+            try:
+                if intents is None:
+                    intents = [await self.aclassify_fallback(query, confidence, neighbour)]
+                if len(intents) > 1:
+                    result = await self.aanswer_compound(intents, query, student_data)
+                    await asyncio.to_thread(self.remember_turn, student_data, query, result)
+                    return result
+
+                intent = intents[0]
+                cache_key, cached = self.lookup_cached(intent, query, student_data)
+                if cached is not None:
+                    await asyncio.to_thread(self.remember_turn, student_data, query, cached)
+                    return cached
+
+                result = await self.aanswer(intent, query, student_data, on_polished)
+            except LLMBusyError as e:
+                logger.warning(f"[LIMITER] {e}")
+                metrics.increment("llm_rejected")
+                if raise_busy:
+                    raise
+                return LLM_BUSY_REPLY
+
+        await asyncio.to_thread(self.store_answer, cache_key, intent, query, student_data, result)
+        await asyncio.to_thread(self.remember_turn, student_data, query, result)
+        return result
+
+    async def aanswer(self, intent, query, student_data, on_polished=None):
+        # Planning may read the FAQ index (and the model path the conversation store), keep it off the event loop
+        plan = await asyncio.to_thread(self.plan_response, intent, query, student_data)
+        immediate = self.answer_without_llm(intent, plan, student_data, on_polished)
+        if immediate is not None:
+            return immediate
+        plan = await asyncio.to_thread(self.with_history, plan, student_data)
+        return await self.arun_plan(intent, plan)
+
+    def answer(self, intent, query, student_data, on_polished=None):
+        plan = self.plan_response(intent, query, student_data)
+        immediate = self.answer_without_llm(intent, plan, student_data, on_polished)
+        if immediate is not None:
+            return immediate
+        return self.run_plan(intent, self.with_history(plan, student_data))
+
+    def answer_without_llm(self, intent, plan, student_data, on_polished=None):
+        """Returns the reply when no model call is needed, otherwise None."""
+        if plan is None:
+            return UNKNOWN_INTENT_REPLY
+
+        # Verdict is final, there is no task to hand to the model
+        if plan.context is None:
+            return plan.rendered
+
+        # Loan/document verdicts are already decided in Python: answer from the template
+        if self.deterministic and plan.rendered is not None:
+            self.log_agent_output(intent, plan.rendered)
+            if self.polish:
+                self.polish_async(intent, plan, student_data, on_polished)
+            return plan.rendered
+
+        return None
+
+    def build_prompt(self, intent, plan):
+        # Single-prompt equivalent of the crew task, for streaming straight from Ollama;
+        # built from the spec so streaming never has to construct a CrewAI agent
+        if plan.prefix:
+            plan = plan._replace(expected_output=plan.expected_output + PREFIX_SHOWN_NOTE)
+        plan = self.fit_plan(intent, plan)
+        spec = AGENT_SPECS[plan.agent_key]
+        return TASK_PROMPT.render(
+            role=spec.role, goal=spec.goal, history=plan.history, context=plan.context.strip(),
+            expected_output=plan.expected_output
+        )
+
+    def process_query_stream(self, query, student_data):
+        """
+        Streaming counterpart of process_query.
+
+        Yields the answer in chunks: cached and template answers arrive as one
+        chunk, the loan/document check summary is sent before any model output,
+        and LLM answers are streamed token by token from Ollama. Timings for the
+        last call are kept in `last_stream_timing`.
+        """
+        started = time.perf_counter()
+        first_chunk_at = None
+        for chunk in self._stream_answer(query, student_data):
+            if first_chunk_at is None:
+                first_chunk_at = time.perf_counter()
+            yield chunk
+
+        finished = time.perf_counter()
+        self.last_stream_timing = {
+            "time_to_first_token": round((first_chunk_at or finished) - started, 4),
+            "total": round(finished - started, 4),
+        }
+        metrics.observe("stream.first_token", (first_chunk_at or finished) - started)
+        metrics.observe("process_query_stream", finished - started)
+        logger.info(
+            f"[STREAM] first token after {self.last_stream_timing['time_to_first_token']}s, "
+            f"done after {self.last_stream_timing['total']}s"
+        )
+
+    def _stream_answer(self, query, student_data):
+        valid, error_msg = self.validate_input(student_data)
+        if not valid:
+            yield f"⚠️ Error: {error_msg}. Please provide complete and correct student information."
+            return
+        student_data = StudentProfile.from_dict(student_data)
+
+        intents, confidence = self.local_intents(query)
+        neighbour = None
+        if self.wants_similar(intents):
+            similar, neighbour = self.lookup_similar(query, student_data, intents)
+            if similar is not None:
+                yield similar
+                self.remember_turn(student_data, query, similar)
+                return
+        if intents is None:
+            intents = [self.classify_fallback(query, confidence, neighbour)]
+        if len(intents) > 1:
+            # Each part is sent as soon as it and the parts before it are ready
+            sections = []
+            for _, section in self.iter_sections(intents, query, student_data):
+                yield f"\n\n{section}" if sections else section
+                sections.append(section)
+            self.remember_turn(student_data, query, "\n\n".join(sections))
+            return
+
+        intent = intents[0]
+        cache_key, cached = self.lookup_cached(intent, query, student_data)
+        if cached is not None:
+            yield cached
+            self.remember_turn(student_data, query, cached)
+            return
+
+        plan = self.plan_response(intent, query, student_data)
+        if plan is None:
+            yield UNKNOWN_INTENT_REPLY
+            self.remember_turn(student_data, query, UNKNOWN_INTENT_REPLY)
+            return
+
+        if plan.context is None or (self.deterministic and plan.rendered is not None):
+            if plan.context is not None:
+                self.log_agent_output(intent, plan.rendered)
+            result = plan.rendered
+            yield result
+        else:
+            parts = []
+            if plan.prefix:
+                parts.append(f"{plan.prefix}\n\n")
+                yield parts[0]
+            prompt = self.build_prompt(intent, self.with_history(plan, student_data))
+            # The pool and set_llm() stand-ins stream themselves (CrewAI's LLM has a `stream` flag, not a method)
+            stream = getattr(get_llm(), "stream", None)
+            with llm_limiter.slot():
+                for token in (stream(prompt) if callable(stream) else stream_ollama(prompt)):
+                    parts.append(token)
+                    yield token
+            record_llm_call("stream", count_tokens(prompt), len(parts) - bool(plan.prefix))
+            result = "".join(parts)
+            self.log_agent_output(intent, result)
+
+        # Only cache and remember answers that were streamed to completion
+        self.store_answer(cache_key, intent, query, student_data, result)
+        self.remember_turn(student_data, query, result)
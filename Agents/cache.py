@@ -0,0 +1,145 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from Agents.metrics import metrics
+from Agents.rules import RULES_VERSION
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+
+# Profile fields that feed the query context; a change to any of them changes the answer
+PROFILE_FINGERPRINT_FIELDS = [
+    "name",
+    "age",
+    "course_applied",
+    "marks_10th",
+    "marks_12th",
+    "documents_submitted",
+    "loan_requested",
+    "income_certificate",
+]
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_query(query):
+    return _NON_WORD_RE.sub(" ", query.lower()).strip()
+
+
+def profile_fingerprint(profile):
+    parts = []
+    for field in PROFILE_FINGERPRINT_FIELDS:
+        value = getattr(profile, field)
+        if isinstance(value, (list, tuple)):
+            value = "|".join(sorted(str(v) for v in value))
+        parts.append(f"{field}={value}")
+    # Answers persisted under an older rule set no longer match
+    parts.append(f"rules={RULES_VERSION}")
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def make_cache_key(intent, profile, query):
+    return (
+        profile.student_id,
+        intent,
+        profile_fingerprint(profile),
+        normalize_query(query),
+    )
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL for process_query answers.
+
+    Keys start with the student id so every entry for one student can be
+    dropped when their profile is saved or deleted.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_student = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                metrics.increment("response_cache_expirations")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._by_student.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+                metrics.increment("response_cache_evictions")
+
+    def invalidate_student(self, student_id):
+        with self._lock:
+            keys = self._by_student.pop(student_id, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_student.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_student.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_student[key[0]]
+
+
+# Process-wide cache shared by every AdmissionOfficer
+response_cache = ResponseCache()
+metrics.register_info("response_cache", response_cache.stats)
+
+
+def invalidate_student_responses(student_id):
+    response_cache.invalidate_student(student_id.lower())
@@ -0,0 +1,89 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Canonical document id -> label shown to students
+DOCUMENT_LABELS = {
+    "marksheet_10th": "10th Marksheet",
+    "marksheet_12th": "12th Marksheet",
+    "aadhar_card": "Aadhar Card",
+    "photo": "Photo",
+    "transfer_certificate": "Transfer Certificate",
+    "income_certificate": "Income Certificate",
+}
+
+# Other spellings of each document that students and the forms use
+DOCUMENT_ALIASES = {
+    "marksheet_10th": ["Marksheet 10th", "10th Mark Sheet", "Class 10 Marksheet", "SSLC", "10th"],
+    "marksheet_12th": ["Marksheet 12th", "12th Mark Sheet", "Class 12 Marksheet", "HSC", "12th"],
+    "aadhar_card": ["Aadhaar Card", "Aadhar", "Aadhaar"],
+    "photo": ["Photograph", "Passport Photo"],
+    "transfer_certificate": ["TC", "Transfer Cert"],
+    "income_certificate": ["Income Cert", "Income Proof"],
+}
+
+# Documents that must be present to approve admission
+ADMISSION_REQUIRED_DOCS = ["marksheet_10th", "marksheet_12th", "aadhar_card", "photo"]
+
+# Documents that must be present to approve a student loan
+LOAN_REQUIRED_DOCS = ADMISSION_REQUIRED_DOCS + ["income_certificate"]
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_doc_name(name):
+    return _NON_ALNUM_RE.sub("", name.lower()).replace("marksheet", "")
+
+
+def _build_alias_index():
+    # Normalized spelling -> canonical id, longest spellings first for the substring fallback
+    index = {}
+    for doc_id, label in DOCUMENT_LABELS.items():
+        for alias in [label, *DOCUMENT_ALIASES.get(doc_id, [])]:
+            index.setdefault(normalize_doc_name(alias), doc_id)
+    return dict(sorted(index.items(), key=lambda item: -len(item[0])))
+
+
+_ALIAS_INDEX = _build_alias_index()
+
+
+@lru_cache(maxsize=4096)
+def resolve_document(name):
+    """Maps a submitted document name to its canonical id, or None if it is not a known document."""
+    norm = normalize_doc_name(name)
+    if not norm:
+        return None
+    doc_id = _ALIAS_INDEX.get(norm)
+    if doc_id is not None:
+        return doc_id
+    # Free-form uploads such as "Scanned 10th Marksheet (2023)"
+    for alias, doc_id in _ALIAS_INDEX.items():
+        if len(alias) > 3 and alias in norm:
+            return doc_id
+    return None
+
+
+@lru_cache(maxsize=4096)
+def document_ids(submitted_docs):
+    """Normalizes a profile's submitted documents (a tuple) once into a set of canonical ids."""
+    return frozenset(filter(None, map(resolve_document, submitted_docs)))
+
+
+# `items` is [(label, submitted)] in requirement order, `missing` the labels not submitted
+DocumentCheck = namedtuple("DocumentCheck", ["items", "missing", "complete"])
+
+
+def check_documents(submitted_ids, required=ADMISSION_REQUIRED_DOCS):
+    items = [(DOCUMENT_LABELS[doc_id], doc_id in submitted_ids) for doc_id in required]
+    missing = [label for label, submitted in items if not submitted]
+    return DocumentCheck(items, missing, not missing)
+
+
+def check_from_missing(missing_ids, required=ADMISSION_REQUIRED_DOCS):
+    """DocumentCheck rebuilt from stored verdicts, which keep only the missing ids."""
+    items = [(DOCUMENT_LABELS[doc_id], doc_id not in missing_ids) for doc_id in required]
+    return DocumentCheck(items, [DOCUMENT_LABELS[doc_id] for doc_id in missing_ids], not missing_ids)
+
+
+def document_labels(doc_ids):
+    return [DOCUMENT_LABELS[doc_id] for doc_id in doc_ids]
@@ -0,0 +1,178 @@
+import os
+import re
+import threading
+
+from Agents.metrics import metrics
+
+INTENTS = ["eligibility", "loan", "document", "counselling"]
+
+# Minimum local confidence needed before we skip the LLM classifier
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.55"))
+
+# Score at which a single intent is considered a strong match on its own
+STRONG_MATCH_SCORE = 3.0
+
+# Score every intent of a compound question ("missing documents, and can I get a loan?")
+# must reach to be answered alongside the others
+MULTI_INTENT_MIN_SCORE = float(os.getenv("MULTI_INTENT_MIN_SCORE", str(STRONG_MATCH_SCORE)))
+
+# Weighted unigram / bigram cues for each intent (tokens are lowercased and singularised)
+INTENT_KEYWORDS = {
+    "eligibility": {
+        "eligible": 2.0,
+        "eligibility": 2.5,
+        "qualify": 2.0,
+        "shortlist": 3.0,
+        "shortlisted": 3.0,
+        "cutoff": 2.5,
+        "cut off": 2.5,
+        "criteria": 1.5,
+        "mark": 1.0,
+        "percentage": 1.0,
+        "score": 1.0,
+        "selected": 1.5,
+        "get admission": 2.0,
+        "admission chance": 2.5,
+        "can i join": 2.0,
+    },
+    "loan": {
+        "loan": 4.0,
+        "finance": 2.0,
+        "financial": 2.0,
+        "bank": 1.5,
+        "emi": 2.5,
+        "interest": 1.5,
+        "repay": 2.0,
+        "repayment": 2.0,
+        "scholarship": 1.5,
+        "income certificate": 2.5,
+        "afford": 1.5,
+        "fund": 1.5,
+    },
+    "document": {
+        "document": 3.0,
+        "doc": 2.5,
+        "upload": 2.0,
+        "uploaded": 2.0,
+        "submit": 1.5,
+        "submitted": 1.5,
+        "marksheet": 2.5,
+        "aadhar": 2.5,
+        "aadhaar": 2.5,
+        "photo": 2.0,
+        "certificate": 1.5,
+        "transfer certificate": 2.5,
+        "missing": 1.5,
+        "pending": 1.5,
+        "verification": 2.0,
+        "verify": 2.0,
+        "checklist": 2.0,
+    },
+    "counselling": {
+        "counselling": 3.0,
+        "counseling": 3.0,
+        "counsellor": 3.0,
+        "course": 2.0,
+        "branch": 2.0,
+        "college": 1.0,
+        "career": 2.5,
+        "guidance": 2.5,
+        "guide": 2.0,
+        "advice": 2.5,
+        "suggest": 2.0,
+        "recommend": 2.0,
+        "deadline": 2.0,
+        "fee": 1.5,
+        "hostel": 2.0,
+        "campus": 1.5,
+        "next step": 2.0,
+        "process": 1.0,
+        "which": 0.5,
+    },
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _singularise(token):
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def extract_ngrams(text):
+    tokens = [_singularise(t) for t in _TOKEN_RE.findall(text.lower())]
+    grams = set(tokens)
+    grams.update(" ".join(pair) for pair in zip(tokens, tokens[1:]))
+    grams.update(" ".join(tri) for tri in zip(tokens, tokens[1:], tokens[2:]))
+    return grams
+
+
+class KeywordIntentClassifier:
+    """
+    In-process intent classifier that scores a query against weighted n-gram cues.
+
+    Returns the best intent together with a confidence in [0, 1]: the winning
+    intent's share of the total score, damped when the match itself is weak.
+    """
+
+    def __init__(self, keywords=None):
+        keywords = keywords or INTENT_KEYWORDS
+        # Invert to gram -> [(intent, weight)] so scoring is one set lookup per gram
+        self._index = {}
+        for intent, cues in keywords.items():
+            for gram, weight in cues.items():
+                self._index.setdefault(gram, []).append((intent, weight))
+
+    def score(self, query):
+        scores = dict.fromkeys(INTENTS, 0.0)
+        for gram in extract_ngrams(query):
+            for intent, weight in self._index.get(gram, ()):
+                scores[intent] += weight
+        return scores
+
+    def classify(self, query):
+        scores = self.score(query)
+        intent = max(scores, key=scores.get)
+        top = scores[intent]
+        total = sum(scores.values())
+        if top <= 0:
+            return "unknown", 0.0
+        confidence = (top / total) * min(1.0, top / STRONG_MATCH_SCORE)
+        return intent, round(confidence, 3)
+
+    def classify_all(self, query, min_score=MULTI_INTENT_MIN_SCORE):
+        """Every intent scoring at least `min_score`, strongest first."""
+        scores = self.score(query)
+        return sorted((intent for intent in INTENTS if scores[intent] >= min_score), key=lambda i: -scores[i])
+
+
+# Counters for how often the local classifier is trusted vs. falling back to the LLM
+_stats_lock = threading.Lock()
+_intent_stats = {"local": 0, "llm_fallback": 0}
+
+
+def record_intent_decision(fallback):
+    decision = "llm_fallback" if fallback else "local"
+    with _stats_lock:
+        _intent_stats[decision] += 1
+    metrics.increment("intent_decisions", 1, decision)
+
+
+def get_intent_stats():
+    with _stats_lock:
+        stats = dict(_intent_stats)
+    total = stats["local"] + stats["llm_fallback"]
+    stats["total"] = total
+    stats["fallback_rate"] = round(stats["llm_fallback"] / total, 4) if total else 0.0
+    return stats
+
+
+def reset_intent_stats():
+    with _stats_lock:
+        for key in _intent_stats:
+            _intent_stats[key] = 0
+
+
+intent_classifier = KeywordIntentClassifier()
+metrics.register_info("intent_classifier", get_intent_stats)
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict, deque
+
+from Models.llm import count_tokens, truncate_tokens
+
+# Recent turns kept verbatim per student; older ones are rolled into the summary
+MEMORY_TURNS = int(os.getenv("MEMORY_TURNS", "8"))
+# Longest a single stored turn may be; officer letters are cut down to this
+MEMORY_TURN_TOKENS = int(os.getenv("MEMORY_TURN_TOKENS", "120"))
+# Cap on the rolled-up summary of older turns
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "150"))
+# Recent context injected into each task prompt
+MEMORY_CONTEXT_TOKENS = int(os.getenv("MEMORY_CONTEXT_TOKENS", "300"))
+# Conversations held in process at once (least recently used are unloaded; they stay on disk)
+MEMORY_MAX_STUDENTS = int(os.getenv("MEMORY_MAX_STUDENTS", "1000"))
+MEMORY_DIR = os.getenv("MEMORY_DIR", ".conversations")
+# Per-student locks are striped over this many locks, so they take no memory per student
+MEMORY_LOCK_STRIPES = 64
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def summarize_turn(role, text, max_tokens=25):
+    """Compact one-line gist of a turn: its first sentence, trimmed."""
+    text = " ".join(text.split())
+    first = _SENTENCE_END_RE.split(text, 1)[0]
+    return f"{role}: {truncate_tokens(first, max_tokens)}"
+
+
+class FileConversationStore:
+    """Persists each student's conversation state as one JSON file."""
+
+    def __init__(self, directory=MEMORY_DIR):
+        self.directory = directory
+
+    def _path(self, student_id):
+        # A digest, not a sanitized name: "ann lee" and "ann.lee" (or any two non-Latin names) must not share a file
+        digest = hashlib.blake2b(student_id.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.directory, digest + ".json")
+
+    def load(self, student_id):
+        try:
+            with open(self._path(student_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, student_id, state):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(student_id)
+        # A temp file of its own, so concurrent saves (threads or processes) never write into each other's
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, student_id):
+        try:
+            os.remove(self._path(student_id))
+        except FileNotFoundError:
+            pass
+
+
+class _Conversation:
+    __slots__ = ("turns", "summary")
+
+    def __init__(self, max_turns, state=None):
+        state = state or {}
+        self.turns = deque((tuple(turn) for turn in state.get("turns", [])), maxlen=max_turns)
+        self.summary = deque(state.get("summary", []))
+
+    def to_state(self):
+        return {"turns": [list(turn) for turn in self.turns], "summary": list(self.summary)}
+
+
+class ConversationMemory:
+    """
+    Bounded per-student conversation store.
+
+    Each student keeps a ring buffer of recent turns; turns pushed out of it
+    are reduced to one-line gists in a summary capped at `summary_tokens`.
+    State is written through to `store` and at most `max_students`
+    conversations are held in memory, so usage stays flat however long
+    the conversations run.
+    """
+
+    def __init__(self, store=None, max_turns=MEMORY_TURNS, turn_tokens=MEMORY_TURN_TOKENS,
+                 summary_tokens=MEMORY_SUMMARY_TOKENS, max_students=MEMORY_MAX_STUDENTS):
+        self.store = store
+        self.max_turns = max_turns
+        self.turn_tokens = turn_tokens
+        self.summary_tokens = summary_tokens
+        self.max_students = max_students
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+        # Held from update to save so one student's snapshots reach the store in order;
+        # the global lock only guards the in-memory map and is never held across file I/O
+        self._student_locks = [threading.Lock() for _ in range(MEMORY_LOCK_STRIPES)]
+
+    def _student_lock(self, student_id):
+        return self._student_locks[hash(student_id) % len(self._student_locks)]
+
+    def _get(self, student_id):
+        conversation = self._conversations.get(student_id)
+        if conversation is None:
+            state = self.store.load(student_id) if self.store else None
+            conversation = _Conversation(self.max_turns, state)
+            self._conversations[student_id] = conversation
+            while len(self._conversations) > self.max_students:
+                self._conversations.popitem(last=False)
+        else:
+            self._conversations.move_to_end(student_id)
+        return conversation
+
+    def add_turn(self, student_id, role, text):
+        text = truncate_tokens(" ".join(str(text).split()), self.turn_tokens)
+        with self._student_lock(student_id):
+            with self._lock:
+                conversation = self._get(student_id)
+                if len(conversation.turns) == conversation.turns.maxlen:
+                    conversation.summary.append(summarize_turn(*conversation.turns[0]))
+                    while conversation.summary and count_tokens(" ".join(conversation.summary)) > self.summary_tokens:
+                        conversation.summary.popleft()
+                conversation.turns.append((role, text))
+                state = conversation.to_state()
+            if self.store:
+                self.store.save(student_id, state)
+
+    def add_exchange(self, student_id, query, answer):
+        self.add_turn(student_id, "Student", query)
+        self.add_turn(student_id, "Officer", answer)
+
+    def context(self, student_id, budget_tokens=MEMORY_CONTEXT_TOKENS):
+        """Summary plus the newest turns that fit in `budget_tokens`, oldest first; "" if none."""
+        # Not while a save is in flight: a conversation unloaded meanwhile would be reloaded stale
+        with self._student_lock(student_id), self._lock:
+            conversation = self._get(student_id)
+            turns = list(conversation.turns)
+            summary = " | ".join(conversation.summary)
+
+        lines = []
+        used = 0
+        if summary:
+            summary = truncate_tokens(summary, budget_tokens // 3)
+            used = count_tokens(summary)
+        for role, text in reversed(turns):
+            line = f"{role}: {text}"
+            cost = count_tokens(line)
+            if used + cost > budget_tokens:
+                break
+            lines.append(line)
+            used += cost
+        lines.reverse()
+        if summary:
+            lines.insert(0, f"Earlier: {summary}")
+        return "\n".join(lines)
+
+    def forget(self, student_id):
+        with self._student_lock(student_id):
+            with self._lock:
+                self._conversations.pop(student_id, None)
+            if self.store:
+                self.store.delete(student_id)
+
+
+# Process-wide memory shared by every AdmissionOfficer
+conversation_memory = ConversationMemory(store=FileConversationStore())
+
+
+def forget_student_conversation(student_id):
+    conversation_memory.forget(student_id)
@@ -0,0 +1,195 @@
+import functools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_PREFIX = "helpdesk"
+
+# Histogram bucket upper bounds in seconds, from a cache hit up to a slow CPU generation
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("registry", "stage", "started")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.stage, time.perf_counter() - self.started, error=exc_type is not None)
+        return False
+
+
+class MetricsRegistry:
+    """
+    In-process stage latency histograms and counters.
+
+    `span(stage)` times a block, `increment(name, value, label)` bumps a counter.
+    When disabled both return immediately, so instrumented code pays one
+    attribute check. Export with `render_prometheus()` or `snapshot()`.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._stages = {}
+        self._counters = {}
+        self._info = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, stage)
+
+    def observe(self, stage, seconds, error=False):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = {
+                    "count": 0, "sum": 0.0, "max": 0.0, "errors": 0, "buckets": [0] * len(self.buckets)
+                }
+            stats["count"] += 1
+            stats["sum"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            if error:
+                stats["errors"] += 1
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats["buckets"][i] += 1
+                    break
+
+    def increment(self, name, value=1, label=None):
+        if not self.enabled:
+            return
+        key = (name, label)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_info(self, name, collect):
+        """Adds collect() (JSON-serializable state, e.g. per-endpoint stats) to snapshot() as info[name]."""
+        self._info[name] = collect
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": s["count"],
+                    "errors": s["errors"],
+                    "total_s": round(s["sum"], 6),
+                    "mean_ms": round(s["sum"] / s["count"] * 1000, 3) if s["count"] else 0.0,
+                    "max_ms": round(s["max"] * 1000, 3),
+                }
+                for stage, s in self._stages.items()
+            }
+            counters = {}
+            for (name, label), value in self._counters.items():
+                counters.setdefault(name, {})[label or "total"] = value
+        info = {name: collect() for name, collect in list(self._info.items())}
+        return {"enabled": self.enabled, "stages": stages, "counters": counters, "info": info}
+
+    def render_prometheus(self):
+        prefix = METRICS_PREFIX
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each pipeline stage",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, s in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, s["buckets"]):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {s["count"]}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {s["sum"]:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+                lines.append(f'{prefix}_stage_errors_total{{stage="{stage}"}} {s["errors"]}')
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                for (counter, label), value in sorted(self._counters.items(), key=lambda item: str(item[0])):
+                    if counter != name:
+                        continue
+                    labels = f'{{kind="{label}"}}' if label else ""
+                    lines.append(f"{prefix}_{name}_total{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the agents and the db layer
+metrics = MetricsRegistry()
+
+
+def span(stage):
+    return metrics.span(stage)
+
+
+def timed(stage):
+    """Decorator recording each call of the wrapped function as `stage`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return fn(*args, **kwargs)
+            with metrics.span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_call(kind, prompt_tokens, response_tokens):
+    metrics.increment("llm_calls", 1, kind)
+    metrics.increment("llm_prompt_tokens", prompt_tokens, kind)
+    metrics.increment("llm_response_tokens", response_tokens, kind)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body = metrics.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body = json.dumps(metrics.snapshot()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Serves /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
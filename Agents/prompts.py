@@ -0,0 +1,150 @@
+import logging
+import os
+import string
+import textwrap
+
+from Agents.metrics import metrics
+from Models.llm import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens allowed per intent (role line, task context, history and expected output);
+# override with PROMPT_BUDGET_<INTENT>, e.g. PROMPT_BUDGET_LOAN=400
+DEFAULT_PROMPT_BUDGETS = {
+    "intent": 80,
+    "eligibility": 300,
+    "loan": 300,
+    "document": 320,
+    "counselling": 300,
+}
+PROMPT_TOKEN_BUDGETS = {
+    intent: int(os.getenv(f"PROMPT_BUDGET_{intent.upper()}", str(budget)))
+    for intent, budget in DEFAULT_PROMPT_BUDGETS.items()
+}
+
+# Longest student query passed through to a prompt
+MAX_QUERY_TOKENS = int(os.getenv("MAX_QUERY_TOKENS", "120"))
+
+# Profile facts each intent's prompt needs; anything else is left out
+PROFILE_FIELDS = {
+    "eligibility": ("name", "course_applied", "marks_10th", "marks_12th", "documents_submitted"),
+    "loan": ("name", "marks_10th", "marks_12th", "loan_requested", "income_certificate"),
+    "document": ("name", "course_applied", "documents_submitted"),
+    "counselling": ("name", "age", "course_applied", "marks_10th", "marks_12th"),
+}
+ALL_PROFILE_FIELDS = (
+    "name", "age", "course_applied", "marks_10th", "marks_12th",
+    "documents_submitted", "loan_requested", "income_certificate",
+)
+
+_PROFILE_LABELS = {
+    "name": "name",
+    "age": "age",
+    "course_applied": "course",
+    "marks_10th": "10th",
+    "marks_12th": "12th",
+    "documents_submitted": "documents",
+    "loan_requested": "loan",
+    "income_certificate": "income certificate",
+}
+
+
+class PromptTemplate:
+    """
+    A str.format template whose fixed text is dedented and token-counted once.
+
+    `size(**values)` gives the rendered prompt's token count from the field
+    values alone, so budgets can be checked before anything is rendered.
+    """
+
+    __slots__ = ("text", "fields", "static_tokens")
+
+    def __init__(self, text):
+        self.text = textwrap.dedent(text).strip()
+        self.fields = tuple(dict.fromkeys(name for _, name, _, _ in string.Formatter().parse(self.text) if name))
+        self.static_tokens = count_tokens(self.text.format(**dict.fromkeys(self.fields, "")))
+
+    def render(self, **values):
+        return self.text.format(**values)
+
+    def size(self, **values):
+        return self.static_tokens + sum(count_tokens(str(values[field])) for field in self.fields)
+
+
+INTENT_PROMPT = PromptTemplate("""
+    Classify the student query as one of: {intents}. Reply with the category name only.
+
+    Query: "{query}"
+""")
+
+CONTEXT_TEMPLATE = PromptTemplate("""
+    STUDENT PROFILE: {profile}
+    STUDENT QUERY: {query}
+""")
+
+TASK_PROMPT = PromptTemplate("""
+    You are the {role}. {goal}
+
+    {history}{context}
+
+    Respond in this format:
+    {expected_output}
+""")
+
+
+def prompt_budget(intent):
+    return PROMPT_TOKEN_BUDGETS.get(intent, max(PROMPT_TOKEN_BUDGETS.values()))
+
+
+def clip_query(query):
+    return truncate_tokens(" ".join(query.split()), MAX_QUERY_TOKENS)
+
+
+def encode_profile(profile, fields=ALL_PROFILE_FIELDS):
+    """One-line `label: value; ...` rendering of the profile facts in `fields`."""
+    parts = []
+    for field in fields:
+        value = getattr(profile, field)
+        if field in ("marks_10th", "marks_12th"):
+            value = f"{value}%"
+        elif field == "documents_submitted":
+            value = ", ".join(value) or "none"
+        elif field == "loan_requested":
+            value = f"₹{value}"
+        elif field == "income_certificate":
+            value = "yes" if value else "no"
+        parts.append(f"{_PROFILE_LABELS[field]}: {value}")
+    return "; ".join(parts)
+
+
+def encode_document_check(doc_check):
+    """Compact `submitted: ...; missing: ...` form of a DocumentCheck for prompts."""
+    submitted = [doc for doc, present in doc_check.items if present]
+    return f"submitted: {', '.join(submitted) or 'none'}; missing: {', '.join(doc_check.missing) or 'none'}"
+
+
+def history_block(history, max_tokens):
+    """
+    Conversation history as a prompt section of at most `max_tokens` tokens.
+
+    The oldest lines are dropped first; returns "" when nothing fits.
+    """
+    lines = history.splitlines() if history else []
+    header = "RECENT CONVERSATION:"
+    while lines:
+        block = header + "\n" + "\n".join(lines) + "\n\n"
+        if count_tokens(block) <= max_tokens:
+            return block
+        lines.pop(0)
+    return ""
+
+
+def record_prompt_size(intent, tokens):
+    budget = prompt_budget(intent)
+    metrics.increment("prompts", 1, intent)
+    metrics.increment("prompt_tokens", tokens, intent)
+    if tokens > budget:
+        metrics.increment("prompts_over_budget", 1, intent)
+        logger.warning(f"[PROMPT] {intent} prompt is {tokens} tokens, over its budget of {budget}")
+    else:
+        logger.info(f"[PROMPT] {intent} prompt: {tokens}/{budget} tokens")
@@ -0,0 +1,61 @@
+# Admission and loan rules shared by AdmissionOfficer and the batch screening workflow;
+# the required document lists live in Agents/documents.py
+import hashlib
+from collections import namedtuple
+from functools import lru_cache
+
+from Agents.documents import ADMISSION_REQUIRED_DOCS, DOCUMENT_ALIASES, LOAN_REQUIRED_DOCS, document_ids
+
+# Minimum percentage required in both 10th and 12th for a student loan
+MIN_MARKS = 50
+
+# Bump when a rule changes in a way the inputs below don't capture
+RULES_REVISION = 1
+
+# Identifies the rule set a stored verdict was computed under; any change to the
+# thresholds, required documents or document spellings gives a new version
+RULES_VERSION = hashlib.blake2b(
+    repr((RULES_REVISION, MIN_MARKS, ADMISSION_REQUIRED_DOCS, LOAN_REQUIRED_DOCS, sorted(DOCUMENT_ALIASES.items()))).encode("utf-8"),
+    digest_size=6
+).hexdigest()
+
+# Verdicts for one profile under RULES_VERSION; missing_* hold document ids in requirement order
+Eligibility = namedtuple("Eligibility", [
+    "version",
+    "marks_10th_ok",
+    "marks_12th_ok",
+    "marks_ok",
+    "documents_complete",
+    "missing_documents",
+    "loan_eligible",
+    "loan_missing_documents",
+])
+
+
+@lru_cache(maxsize=4096)
+def _evaluate(marks_10th, marks_12th, submitted_ids, income_certificate):
+    marks_10th_ok = marks_10th >= MIN_MARKS
+    marks_12th_ok = marks_12th >= MIN_MARKS
+    missing = tuple(doc_id for doc_id in ADMISSION_REQUIRED_DOCS if doc_id not in submitted_ids)
+    loan_missing = tuple(doc_id for doc_id in LOAN_REQUIRED_DOCS if doc_id not in submitted_ids)
+    marks_ok = marks_10th_ok and marks_12th_ok
+    return Eligibility(
+        RULES_VERSION,
+        marks_10th_ok,
+        marks_12th_ok,
+        marks_ok,
+        not missing,
+        missing,
+        # Same gate as the loan chat flow and batch screening: income certificate, marks and every loan document
+        income_certificate and marks_ok and not loan_missing,
+        loan_missing,
+    )
+
+
+def evaluate(profile):
+    """Eligibility verdicts for a StudentProfile, memoized on the fields they depend on."""
+    submitted_ids = document_ids(profile.documents_submitted)
+    # The income certificate flag counts as submitting the document
+    if profile.income_certificate:
+        submitted_ids = submitted_ids | {"income_certificate"}
+    return _evaluate(profile.marks_10th, profile.marks_12th, submitted_ids, profile.income_certificate)
@@ -0,0 +1,240 @@
+import hashlib
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from Agents.cache import normalize_query, profile_fingerprint
+from Agents.metrics import metrics, timed
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "1") != "0"
+# Cosine similarity a past question needs to reuse its answer (same profile fingerprint only)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# Similarity a past question (of any student) needs to reuse just its intent
+SEMANTIC_INTENT_THRESHOLD = float(os.getenv("SEMANTIC_INTENT_THRESHOLD", "0.88"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "5000"))
+# Expired and surplus entries are pruned once per this many stores
+SEMANTIC_CACHE_PRUNE_EVERY = int(os.getenv("SEMANTIC_CACHE_PRUNE_EVERY", "100"))
+# Entries read per round trip while looking for the oldest ones to evict
+SEMANTIC_CACHE_PAGE_SIZE = int(os.getenv("SEMANTIC_CACHE_PAGE_SIZE", "1000"))
+
+QUERY_CACHE_COLLECTION = "query_cache"
+
+logger = logging.getLogger(__name__)
+
+# Nearest past question; `answer` is None when it is not close enough to reuse the answer
+SemanticHit = namedtuple("SemanticHit", ["intent", "answer", "similarity"])
+# lookup() result when this profile has no past questions at all
+NO_NEIGHBOUR = SemanticHit(None, None, 0.0)
+
+
+class SemanticQueryCache:
+    """
+    Answers to past questions, looked up by embedding similarity.
+
+    Each answered question is stored in its own Chroma collection (which
+    embeds it) with the intent, the answer and the profile fingerprint, so
+    "can I get a loan" can reuse the answer given to "am I eligible for a
+    loan?" for an unchanged profile. Entries expire after `ttl` seconds and
+    the oldest are evicted beyond `max_entries`. Any storage error counts as
+    a miss.
+    """
+
+    def __init__(self, collection=QUERY_CACHE_COLLECTION, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 intent_threshold=SEMANTIC_INTENT_THRESHOLD, ttl=SEMANTIC_CACHE_TTL,
+                 max_entries=SEMANTIC_CACHE_SIZE, prune_every=SEMANTIC_CACHE_PRUNE_EVERY, connection=None):
+        self.collection = collection
+        self.threshold = threshold
+        self.intent_threshold = intent_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._connection = connection
+        self._lock = threading.Lock()
+        self._stores_since_prune = 0
+        self._warned = False
+        self.hits = 0
+        self.intent_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def connection(self):
+        if self._connection is not None:
+            return self._connection
+        # Looked up per call (and imported late, as Database.db imports this module)
+        import Database.db as db
+        return db.connection
+
+    def _run(self, operation):
+        return self.connection.run(operation, name=self.collection)
+
+    def _failed(self, action, error):
+        with self._lock:
+            self.errors += 1
+            warned, self._warned = self._warned, True
+        log = logger.debug if warned else logger.warning
+        log(f"[SEMANTIC CACHE] {action} failed, treating as a miss: {error}")
+
+    def _unsupported(self):
+        # Backends without a vector index (STORAGE_BACKEND=sqlite) leave the cache off
+        try:
+            return not self.connection.supports_query
+        except Exception:
+            # Backend unreachable: the call itself fails and counts as a miss
+            return False
+
+    def _nearest(self, query, where):
+        result = self._run(lambda collection: collection.query(
+            query_texts=[query],
+            n_results=1,
+            where=where,
+            include=["metadatas", "distances"]
+        ))
+        metadatas = (result.get("metadatas") or [[]])[0]
+        distances = (result.get("distances") or [[]])[0]
+        if not metadatas:
+            return None, 0.0
+        return metadatas[0] or {}, 1.0 - distances[0]
+
+    @timed("semantic_cache.lookup")
+    def lookup(self, query, profile):
+        """
+        SemanticHit for the closest past question from this exact profile, with
+        its answer only if it is similar enough to reuse (NO_NEIGHBOUR if there
+        is none); None when the cache is unsupported or unreachable.
+        """
+        if self._unsupported():
+            return None
+        where = {"$and": [
+            {"fingerprint": profile_fingerprint(profile)},
+            {"expires_at": {"$gt": time.time()}},
+        ]}
+        try:
+            metadata, similarity = self._nearest(query, where)
+        except Exception as e:
+            self._failed("lookup", e)
+            return None
+
+        hit = metadata is not None and similarity >= self.threshold
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.increment("semantic_cache_lookups", 1, "hit" if hit else "miss")
+        if metadata is None:
+            return NO_NEIGHBOUR
+        return SemanticHit(metadata.get("intent"), metadata.get("answer") if hit else None, round(similarity, 4))
+
+    @timed("semantic_cache.lookup_intent")
+    def lookup_intent(self, query):
+        """Intent of the closest past question from any student, if it is similar enough to trust."""
+        if self._unsupported():
+            return None
+        try:
+            metadata, similarity = self._nearest(query, {"expires_at": {"$gt": time.time()}})
+        except Exception as e:
+            self._failed("intent lookup", e)
+            return None
+        if metadata is None:
+            return None
+        return self.intent_of(SemanticHit(metadata.get("intent"), None, similarity))
+
+    def intent_of(self, hit):
+        """The intent of a lookup's nearest question if it is similar enough to trust, else None."""
+        if hit is None or hit.similarity < self.intent_threshold:
+            return None
+        with self._lock:
+            self.intent_hits += 1
+        metrics.increment("semantic_intent_hits")
+        return hit.intent
+
+    @timed("semantic_cache.store")
+    def store(self, query, profile, intent, answer):
+        if self._unsupported():
+            return
+        fingerprint = profile_fingerprint(profile)
+        entry_id = hashlib.blake2b(
+            f"{fingerprint}\x1f{normalize_query(query)}".encode("utf-8"), digest_size=12
+        ).hexdigest()
+        now = time.time()
+        metadata = {
+            "student_id": profile.student_id,
+            "fingerprint": fingerprint,
+            "intent": intent,
+            "answer": str(answer),
+            "created_at": now,
+            "expires_at": now + self.ttl,
+        }
+        try:
+            self._run(lambda collection: collection.upsert(ids=[entry_id], documents=[query], metadatas=[metadata]))
+        except Exception as e:
+            self._failed("store", e)
+            return
+
+        with self._lock:
+            self._stores_since_prune += 1
+            due = self._stores_since_prune >= self.prune_every
+            if due:
+                self._stores_since_prune = 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Drops expired entries, then the oldest ones beyond max_entries."""
+        try:
+            self._run(lambda collection: collection.delete(where={"expires_at": {"$lte": time.time()}}))
+            surplus = self._run(lambda collection: collection.count()) - self.max_entries
+            if surplus > 0:
+                oldest = heapq.nsmallest(surplus, self._ages())
+                self._run(lambda collection: collection.delete(ids=[entry_id for _, entry_id in oldest]))
+        except Exception as e:
+            self._failed("prune", e)
+
+    def _ages(self):
+        # (created_at, id) of every entry, a page at a time so only the oldest are held
+        offset = 0
+        while True:
+            page = self._run(lambda collection: collection.get(
+                limit=SEMANTIC_CACHE_PAGE_SIZE,
+                offset=offset,
+                include=["metadatas"]
+            ))
+            ids = page.get("ids") or []
+            for entry_id, metadata in zip(ids, page.get("metadatas") or []):
+                yield (metadata or {}).get("created_at", 0), entry_id
+            if len(ids) < SEMANTIC_CACHE_PAGE_SIZE:
+                return
+            offset += SEMANTIC_CACHE_PAGE_SIZE
+
+    def forget_student(self, student_id):
+        try:
+            self._run(lambda collection: collection.delete(where={"student_id": student_id}))
+        except Exception as e:
+            self._failed("forget", e)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "intent_hits": self.intent_hits,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Process-wide cache shared by every AdmissionOfficer, unless disabled with SEMANTIC_CACHE=0
+semantic_query_cache = SemanticQueryCache() if SEMANTIC_CACHE_ENABLED else None
+if semantic_query_cache is not None:
+    metrics.register_info("semantic_cache", semantic_query_cache.stats)
+
+
+def forget_student_queries(student_id):
+    if semantic_query_cache is not None:
+        semantic_query_cache.forget_student(student_id)
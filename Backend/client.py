@@ -0,0 +1,149 @@
+import codecs
+import http.client
+import json
+import os
+import threading
+from urllib.parse import quote, urlencode, urlsplit
+
+from Database.profile import StudentProfile
+
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8080")
+# Chat answers can wait on the LLM for a while
+BACKEND_TIMEOUT = float(os.getenv("BACKEND_TIMEOUT", "180"))
+
+_READ_SIZE = 4096
+
+
+class BackendError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class BackendBusyError(BackendError):
+    """The backend or the model behind it is at capacity (HTTP 429); retry after `retry_after` seconds."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(429, message)
+        self.retry_after = retry_after
+
+
+class HelpdeskClient:
+    """
+    Client for Backend.server.
+
+    Each thread keeps one persistent HTTP/1.1 connection, so consecutive
+    requests from a Streamlit session skip the TCP handshake.
+    """
+
+    def __init__(self, base_url=BACKEND_URL, timeout=BACKEND_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = factory(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                break
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.CannotSendRequest):
+                # The server closed an idle keep-alive connection; reconnect once
+                self._reset()
+                if attempt:
+                    raise
+
+        if response.status >= 400:
+            data = response.read()
+            try:
+                message = json.loads(data).get("error") or response.reason
+            except ValueError:
+                message = response.reason
+            if response.status == 429:
+                retry_after = response.getheader("Retry-After")
+                raise BackendBusyError(message, float(retry_after) if retry_after else None)
+            raise BackendError(response.status, message)
+        return response
+
+    def _json(self, method, path, payload=None):
+        return json.loads(self._request(method, path, payload).read())
+
+    @staticmethod
+    def _student_path(name):
+        return "/students/" + quote(name.strip(), safe="")
+
+    def get_student(self, name):
+        try:
+            return StudentProfile.from_dict(self._json("GET", self._student_path(name)))
+        except BackendError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def suggest_names(self, text, limit=None):
+        """Stored names starting with, or a typo away from, `text`."""
+        params = {"match": text}
+        if limit is not None:
+            params["limit"] = limit
+        return self._json("GET", "/students?" + urlencode(params))["names"]
+
+    def save_student(self, profile):
+        profile = StudentProfile.from_dict(profile)
+        return StudentProfile.from_dict(self._json("PUT", self._student_path(profile.name), profile.to_dict()))
+
+    @staticmethod
+    def _chat_payload(query, profile):
+        # Only the name: the backend answers from the stored profile and its saved verdicts
+        name = profile if isinstance(profile, str) else StudentProfile.from_dict(profile).name
+        return {"query": query, "name": name}
+
+    def delete_student(self, name):
+        self._json("DELETE", self._student_path(name))
+
+    def chat(self, query, profile):
+        """Answers `query` for the stored profile of `profile`'s student (a profile, dict or name)."""
+        return self._json("POST", "/chat", self._chat_payload(query, profile))["answer"]
+
+    def chat_stream(self, query, profile):
+        """Yields the answer as the backend produces it."""
+        payload = self._chat_payload(query, profile)
+        response = self._request("POST", "/chat/stream", payload)
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        finished = False
+        try:
+            while True:
+                data = response.read1(_READ_SIZE)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+            finished = True
+        finally:
+            # A half-read response leaves the connection unusable for the next request
+            if not finished:
+                self._reset()
@@ -0,0 +1,417 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import Database.db as db
+from Agents.agent import LLM_BUSY_REPLY, AdmissionOfficer, get_llm
+from Agents.cache import ResponseCache
+from Agents.metrics import metrics, start_metrics_server
+from Database.name_index import NAME_INDEX_REFRESH, NAME_SUGGESTIONS, name_index
+from Database.profile import StudentProfile
+from Models.llm import LLMBusyError, OllamaPool
+
+BACKEND_HOST = os.getenv("BACKEND_HOST", "0.0.0.0")
+BACKEND_PORT = int(os.getenv("BACKEND_PORT", "8080"))
+# Requests served at once; also the thread pool running every database and LLM call
+BACKEND_WORKERS = int(os.getenv("BACKEND_WORKERS", "16"))
+# Requests allowed to wait for a worker; beyond that new ones get 429 Too Many Requests
+BACKEND_QUEUE_SIZE = int(os.getenv("BACKEND_QUEUE_SIZE", "64"))
+# Idle keep-alive connections are closed after this many seconds
+BACKEND_KEEP_ALIVE = float(os.getenv("BACKEND_KEEP_ALIVE", "30"))
+# Seconds a client that is told to back off should wait
+BACKEND_RETRY_AFTER = int(os.getenv("BACKEND_RETRY_AFTER", "2"))
+# Stored profiles reused by chat turns; writes through this backend refresh them at once,
+# writes from elsewhere (other replicas, bulk imports) show up within the TTL
+BACKEND_PROFILE_CACHE_SIZE = int(os.getenv("BACKEND_PROFILE_CACHE_SIZE", "4096"))
+BACKEND_PROFILE_CACHE_TTL = float(os.getenv("BACKEND_PROFILE_CACHE_TTL", "30"))
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADERS = 100
+
+logger = logging.getLogger(__name__)
+
+Request = namedtuple("Request", ["method", "path", "query", "version", "headers", "body"])
+
+# Marks the end of a streamed answer on the queue between worker thread and event loop
+_STREAM_END = object()
+# Appended when a streamed answer fails after its 200 head has gone out
+STREAM_FAILED_NOTE = "\n\n⚠️ Sorry, something went wrong while answering. Please try again."
+
+
+class HttpError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+        self.message = message or status.phrase
+
+
+async def read_request(reader):
+    """Parses one HTTP/1.1 request from `reader`, or returns None when the client closed the connection."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+    return Request(method.upper(), url.path, query, version.upper(), headers, body)
+
+
+def wants_keep_alive(request):
+    connection = request.headers.get("connection", "").lower()
+    if request.version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+class HelpdeskServer:
+    """
+    Async HTTP service around one shared AdmissionOfficer.
+
+    Frontends talk to this instead of importing the agents themselves, so
+    the LLM client, agents, caches and Ollama endpoint pool are built and
+    warmed once per backend rather than once per frontend process.
+
+    Routes (JSON bodies and replies):
+        GET    /health
+        GET    /students?match=<text> {"names"}: autocomplete and near-miss names
+        GET    /students/<name>       stored profile (any case or spacing), 404 if unknown
+        PUT    /students/<name>       save a profile (the path sets the name)
+        POST   /students              save a profile
+        DELETE /students/<name>
+        POST   /chat                  {"query", "name"} -> {"answer"}, on the stored profile
+        POST   /chat/stream           same body, answer streamed as chunked text
+
+    At most `workers` requests are served at once, all blocking work runs
+    on one shared thread pool of that size, and up to `queue_size` more
+    wait their turn; anything beyond that is answered 429 straight away.
+    Connections are kept alive between requests.
+    """
+
+    def __init__(self, officer=None, workers=BACKEND_WORKERS, queue_size=BACKEND_QUEUE_SIZE,
+                 keep_alive=BACKEND_KEEP_ALIVE):
+        self.officer = officer or AdmissionOfficer()
+        self.workers = workers
+        self.queue_size = queue_size
+        self.keep_alive = keep_alive
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backend")
+        # Name lookups get their own thread so they don't queue behind slow chat requests
+        self.lookups = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backend-lookup")
+        # Keyed by (student_id,) so ResponseCache.invalidate_student drops a profile
+        self.profiles = ResponseCache(max_entries=BACKEND_PROFILE_CACHE_SIZE, ttl=BACKEND_PROFILE_CACHE_TTL)
+        # Created in serve(), on the loop that uses them
+        self._slots = None
+        self._server = None
+        self._index_refresh = None
+        self.pending = 0
+
+    def warm_up(self):
+        try:
+            db.load_name_index()
+        except Exception as e:
+            # Lookups still work by exact id; suggestions fill in as profiles are saved
+            logger.error("❌ Could not load the name index: %s", e)
+        # Build the LLM client and load the model before the first student asks anything
+        llm = get_llm()
+        if isinstance(llm, OllamaPool):
+            llm.warm_up(wait=False)
+            llm.start_health_checks()
+
+    async def start(self, host=BACKEND_HOST, port=BACKEND_PORT):
+        loop = asyncio.get_running_loop()
+        # asyncio.to_thread (db wrappers, aprocess_query) then runs on the same bounded pool
+        loop.set_default_executor(self.executor)
+        self._slots = asyncio.Semaphore(self.workers)
+        await loop.run_in_executor(self.executor, self.warm_up)
+        if NAME_INDEX_REFRESH > 0:
+            self._index_refresh = asyncio.create_task(self._refresh_name_index())
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in self._server.sockets)
+        logger.info("✅ Helpdesk backend listening on %s", addresses)
+        return self._server
+
+    async def _refresh_name_index(self):
+        # Names saved or deleted by other replicas and command-line imports show up here
+        while True:
+            await asyncio.sleep(NAME_INDEX_REFRESH)
+            try:
+                await asyncio.to_thread(db.load_name_index)
+            except Exception as e:
+                logger.warning("⚠️ Name index refresh failed, keeping the current one: %s", e)
+
+    async def serve(self, host=BACKEND_HOST, port=BACKEND_PORT):
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), timeout=self.keep_alive)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except HttpError as e:
+                    await self._send_json(writer, e.status, {"error": e.message}, keep_alive=False)
+                    return
+                if request is None:
+                    return
+
+                keep_alive = wants_keep_alive(request)
+                await self._respond(request, writer, keep_alive)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, request, writer, keep_alive):
+        if request.path.rstrip("/") == "/health":
+            await self._send_json(writer, HTTPStatus.OK, {
+                "status": "ok", "pending": self.pending, "workers": self.workers, "queue_size": self.queue_size
+            }, keep_alive)
+            return
+        if request.method == "GET" and request.path.rstrip("/") == "/students":
+            # Autocomplete is answered from memory without a request slot, so busy workers never
+            # delay it; it still runs off the loop so fuzzy scoring can't stall other requests
+            try:
+                limit = min(int(request.query.get("limit") or NAME_SUGGESTIONS), 50)
+            except ValueError:
+                limit = NAME_SUGGESTIONS
+            loop = asyncio.get_running_loop()
+            names = await loop.run_in_executor(self.lookups, name_index.suggest, request.query.get("match", ""), limit)
+            await self._send_json(writer, HTTPStatus.OK, {"names": names}, keep_alive)
+            return
+
+        # Backpressure: shed load instead of letting queued requests time out
+        if self.pending >= self.workers + self.queue_size:
+            metrics.increment("backend_rejected")
+            await self._send_json(writer, HTTPStatus.TOO_MANY_REQUESTS, {"error": "server busy"}, keep_alive,
+                                  headers={"Retry-After": str(BACKEND_RETRY_AFTER)})
+            return
+
+        self.pending += 1
+        try:
+            async with self._slots:
+                with metrics.span("backend.request"):
+                    await self._dispatch(request, writer, keep_alive)
+        except HttpError as e:
+            await self._send_json(writer, e.status, {"error": e.message}, keep_alive)
+        except db.StorageError as e:
+            await self._send_json(writer, HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}, keep_alive,
+                                  headers={"Retry-After": str(BACKEND_RETRY_AFTER)})
+        except ConnectionError:
+            raise
+        except Exception as e:
+            logger.exception("❌ %s %s failed", request.method, request.path)
+            await self._send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}, keep_alive)
+        finally:
+            self.pending -= 1
+
+    async def _dispatch(self, request, writer, keep_alive):
+        parts = [unquote(part) for part in request.path.strip("/").split("/")]
+        method = request.method
+
+        if parts[0] == "students" and len(parts) <= 2:
+            name = parts[1] if len(parts) == 2 else None
+            if method == "GET" and name:
+                profile = await self._stored_profile(name, fresh=True)
+                if profile is None:
+                    raise HttpError(HTTPStatus.NOT_FOUND, f"no profile for {name}")
+                result = profile.to_dict()
+            elif (method == "PUT" and name) or (method == "POST" and not name):
+                data = self._json(request)
+                if name:
+                    data["name"] = name
+                profile = self._profile(data)
+                self._forget_profile(profile.name)
+                await db.aadd_student_data(profile)
+                self._forget_profile(profile.name)
+                result = profile.to_dict()
+            elif method == "DELETE" and name:
+                self._forget_profile(name)
+                await db.adelete_student_by_name(name)
+                self._forget_profile(name)
+                result = {"deleted": name}
+            else:
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED)
+            await self._send_json(writer, HTTPStatus.OK, result, keep_alive)
+
+        elif parts[0] == "chat" and method == "POST" and len(parts) <= 2:
+            data = self._json(request)
+            query = str(data.get("query") or "").strip()
+            if not query:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "missing query")
+            profile = await self._chat_profile(data)
+            if parts[1:] == ["stream"]:
+                await self._stream_answer(writer, query, profile, keep_alive)
+            elif len(parts) == 1:
+                try:
+                    answer = await self.officer.aprocess_query(query, profile, raise_busy=True)
+                except LLMBusyError as e:
+                    # Counted as llm_rejected by the officer; the client retries after the hint
+                    await self._send_json(writer, HTTPStatus.TOO_MANY_REQUESTS, {"error": str(e)}, keep_alive,
+                                          headers={"Retry-After": str(BACKEND_RETRY_AFTER)})
+                    return
+                await self._send_json(writer, HTTPStatus.OK, {"answer": str(answer)}, keep_alive)
+            else:
+                raise HttpError(HTTPStatus.NOT_FOUND)
+
+        else:
+            raise HttpError(HTTPStatus.NOT_FOUND)
+
+    def _json(self, request):
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+        return data
+
+    def _profile(self, data):
+        try:
+            return StudentProfile.from_dict(data)
+        except (ValueError, AttributeError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"invalid profile: {e}")
+
+    async def _chat_profile(self, data):
+        # Answers use the stored profile, with the verdicts saved alongside it, not a copy the client holds
+        name = str(data.get("name") or "").strip()
+        if not name:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "missing name")
+        profile = await self._stored_profile(name)
+        if profile is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"no profile for {name}")
+        return profile
+
+    async def _stored_profile(self, name, fresh=False):
+        key = (db.resolve_student_id(name),)
+        profile = None if fresh else self.profiles.get(key)
+        if profile is None:
+            profile = await db.aget_student_by_name(name)
+            if profile is not None:
+                self.profiles.set(key, profile)
+        return profile
+
+    def _forget_profile(self, name):
+        # Before a write (the id it resolved to) and after it (the id it resolves to now)
+        self.profiles.invalidate_student(db.resolve_student_id(name))
+
+    async def _stream_answer(self, writer, query, profile, keep_alive):
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            generator = self.officer.process_query_stream(query, profile)
+            try:
+                for chunk in generator:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+            finally:
+                generator.close()
+                loop.call_soon_threadsafe(chunks.put_nowait, _STREAM_END)
+
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            # Hold the head back until the answer starts, so a failure can still get a real status
+            chunk = await chunks.get()
+            if isinstance(chunk, LLMBusyError):
+                metrics.increment("llm_rejected")
+                await self._send_json(writer, HTTPStatus.TOO_MANY_REQUESTS, {"error": str(chunk)}, keep_alive,
+                                      headers={"Retry-After": str(BACKEND_RETRY_AFTER)})
+                return
+            if isinstance(chunk, Exception):
+                logger.error("❌ Streamed answer failed: %s", chunk)
+                await self._send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(chunk)}, keep_alive)
+                return
+
+            metrics.increment("backend_responses", 1, str(HTTPStatus.OK.value))
+            self._write_head(writer, HTTPStatus.OK, "text/plain; charset=utf-8", keep_alive,
+                             {"Transfer-Encoding": "chunked"})
+            while chunk is not _STREAM_END:
+                if isinstance(chunk, Exception):
+                    # Too late for an error status: say so in the answer itself
+                    logger.error("❌ Streamed answer failed: %s", chunk)
+                    chunk = f"\n\n{LLM_BUSY_REPLY}" if isinstance(chunk, LLMBusyError) else STREAM_FAILED_NOTE
+                data = str(chunk).encode("utf-8")
+                if data:
+                    writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    await writer.drain()
+                chunk = await chunks.get()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            # The client went away (or the answer failed): stop generating tokens nobody will read
+            stop.set()
+            await producer
+
+    def _write_head(self, writer, status, content_type, keep_alive, headers=None):
+        lines = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Content-Type: {content_type}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if keep_alive:
+            lines.append(f"Keep-Alive: timeout={int(self.keep_alive)}")
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send_json(self, writer, status, payload, keep_alive=True, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        metrics.increment("backend_responses", 1, str(status.value))
+        self._write_head(writer, status, "application/json", keep_alive,
+                         {"Content-Length": str(len(body)), **(headers or {})})
+        writer.write(body)
+        await writer.drain()
+
+
+# Run the backend: python -m Backend.server [--port 8080] [--workers 16] [--queue-size 64]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve profile CRUD and chat over HTTP")
+    parser.add_argument("--host", default=BACKEND_HOST)
+    parser.add_argument("--port", type=int, default=BACKEND_PORT)
+    parser.add_argument("--workers", type=int, default=BACKEND_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=BACKEND_QUEUE_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    metrics_port = os.getenv("METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(int(metrics_port))
+    try:
+        asyncio.run(HelpdeskServer(workers=args.workers, queue_size=args.queue_size).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
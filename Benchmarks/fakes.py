@@ -0,0 +1,208 @@
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+from Agents.intent import intent_classifier
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Like Chroma, range operators only match numeric values
+_OPERATORS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: _is_number(a) and a > b,
+    "$gte": lambda a, b: _is_number(a) and a >= b,
+    "$lt": lambda a, b: _is_number(a) and a < b,
+    "$lte": lambda a, b: _is_number(a) and a <= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+}
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def word_cosine(a, b):
+    """Cosine similarity of two texts' word counts, standing in for embedding similarity."""
+    va, vb = Counter(_WORD_RE.findall(a.lower())), Counter(_WORD_RE.findall(b.lower()))
+    dot = sum(count * vb[word] for word, count in va.items())
+    norm = math.sqrt(sum(c * c for c in va.values())) * math.sqrt(sum(c * c for c in vb.values()))
+    return dot / norm if norm else 0.0
+
+
+def matches_where(metadata, where):
+    """Evaluates the subset of Chroma's `where` syntax the app uses against one metadata dict."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            if not all(_OPERATORS[op](value, operand) for op, operand in condition.items()):
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class InMemoryCollection:
+    """
+    Chroma collection stand-in keeping records in a dict.
+
+    `latency` seconds are slept per call to approximate a server round trip.
+    """
+
+    def __init__(self, name, latency=0.0):
+        self.name = name
+        self.latency = latency
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None):
+        self._round_trip()
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+        embeddings = embeddings or [None] * len(ids)
+        with self._lock:
+            for record in zip(ids, documents, metadatas, embeddings):
+                self._records[record[0]] = (record[1], dict(record[2]), record[3])
+
+    add = upsert
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None):
+        self._round_trip()
+        with self._lock:
+            if ids is not None:
+                selected = [(i, self._records[i]) for i in ids if i in self._records]
+            else:
+                selected = list(self._records.items())
+        selected = [(i, r) for i, r in selected if matches_where(r[1], where)]
+        start = offset or 0
+        selected = selected[start:start + limit] if limit is not None else selected[start:]
+        return {
+            "ids": [i for i, _ in selected],
+            "documents": [r[0] for _, r in selected],
+            "metadatas": [dict(r[1]) for _, r in selected],
+        }
+
+    def query(self, query_texts, n_results=10, where=None, include=None):
+        self._round_trip()
+        with self._lock:
+            records = [(i, r) for i, r in self._records.items() if matches_where(r[1], where)]
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for text in query_texts:
+            ranked = sorted(records, key=lambda item: -word_cosine(text, item[1][0] or ""))[:n_results]
+            result["ids"].append([i for i, _ in ranked])
+            result["documents"].append([r[0] for _, r in ranked])
+            result["metadatas"].append([dict(r[1]) for _, r in ranked])
+            # Cosine distance, as in a collection created with hnsw:space=cosine
+            result["distances"].append([1.0 - word_cosine(text, r[0] or "") for _, r in ranked])
+        return result
+
+    def delete(self, ids=None, where=None):
+        self._round_trip()
+        with self._lock:
+            for i in list(ids if ids is not None else self._records):
+                if i in self._records and matches_where(self._records[i][1], where):
+                    del self._records[i]
+
+    def count(self):
+        with self._lock:
+            return len(self._records)
+
+
+class InMemoryClient:
+    """Stand-in for chromadb.HttpClient; pass as ChromaConnection(client_factory=...)."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self
+
+    def get_or_create_collection(self, name, **kwargs):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = InMemoryCollection(name, self.latency)
+            return self._collections[name]
+
+    def heartbeat(self):
+        return int(time.time() * 1e9)
+
+
+class FakeOllamaLLM:
+    """
+    Deterministic stand-in for the CrewAI Ollama LLM returned by get_ollama_model().
+
+    Each call sleeps `latency` seconds (time to first token) plus
+    `reply_tokens / tokens_per_second`, then returns a fixed reply.
+    Intent classification prompts get the keyword classifier's answer.
+    """
+
+    def __init__(self, latency=0.2, tokens_per_second=40.0, reply_tokens=120):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generation_time(self, tokens):
+        return self.latency + tokens / self.tokens_per_second if self.tokens_per_second else self.latency
+
+    def call(self, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if "Classify the student query" in prompt:
+            time.sleep(self.generation_time(1))
+            query = prompt.rsplit("Query:", 1)[-1]
+            intent, _ = intent_classifier.classify(query)
+            return "counselling" if intent == "unknown" else intent
+        time.sleep(self.generation_time(self.reply_tokens))
+        return " ".join(["token"] * self.reply_tokens)
+
+    def stream(self, prompt):
+        # Same timing as call(), delivered token by token like Models.llm.stream_ollama
+        time.sleep(self.latency)
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0
+        for i in range(self.reply_tokens):
+            if delay:
+                time.sleep(delay)
+            yield "token" if i == 0 else " token"
+
+
+DOCUMENT_CHOICES = ["Marksheet 10th", "Marksheet 12th", "Aadhar Card", "Photo", "Transfer Certificate"]
+COURSES = ["B.Tech CSE", "B.Tech ECE", "BBA", "B.Com", "BSc Physics", "BA English"]
+
+
+def make_profiles(count, seed=0):
+    """Generates `count` reproducible profile dicts."""
+    rng = random.Random(seed)
+    profiles = []
+    for i in range(count):
+        profiles.append({
+            "name": f"Student {i:06d}",
+            "age": rng.randint(17, 24),
+            "course_applied": rng.choice(COURSES),
+            "marks_10th": round(rng.uniform(35, 99), 1),
+            "marks_12th": round(rng.uniform(35, 99), 1),
+            "documents_submitted": rng.sample(DOCUMENT_CHOICES, rng.randint(2, len(DOCUMENT_CHOICES))),
+            "loan_requested": float(rng.choice([0, 50000, 100000, 250000])),
+            "income_certificate": rng.random() < 0.6,
+        })
+    return profiles
@@ -0,0 +1,106 @@
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+
+# Modules whose cold import cost we track
+DEFAULT_MODULES = ["Agents.agent", "Models.llm", "Database.db"]
+
+# Heavy dependencies that should only load when a query actually needs them
+WATCHED_IMPORTS = ["crewai", "litellm", "chromadb"]
+
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_import(module, python=sys.executable):
+    """
+    Imports `module` in a fresh interpreter under `-X importtime`.
+
+    Returns:
+        dict: {"cumulative_ms", "slowest": [(name, cumulative_ms)], "loaded": [watched modules imported]}
+    """
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            timings[match.group(4)] = int(match.group(2)) / 1000
+    loaded = sorted({name.split(".")[0] for name in timings} & set(WATCHED_IMPORTS))
+    slowest = sorted(
+        ((name, ms) for name, ms in timings.items() if name != module),
+        key=lambda item: -item[1]
+    )[:10]
+    return {"cumulative_ms": timings.get(module, 0.0), "slowest": slowest, "loaded": loaded}
+
+
+def run(modules=DEFAULT_MODULES, repeat=5):
+    results = {}
+    for module in modules:
+        try:
+            runs = [measure_import(module) for _ in range(repeat)]
+        except RuntimeError as e:
+            results[module] = {"error": str(e)}
+            continue
+        results[module] = {
+            "median_ms": round(statistics.median(r["cumulative_ms"] for r in runs), 2),
+            "min_ms": round(min(r["cumulative_ms"] for r in runs), 2),
+            "loaded": runs[0]["loaded"],
+            "slowest": [(name, round(ms, 2)) for name, ms in runs[0]["slowest"]],
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for module, result in results.items():
+        before = baseline.get(module)
+        if not before or "error" in result or "error" in before:
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] if before["median_ms"] else 0.0
+        print(f"   {module}: {before['median_ms']}ms -> {result['median_ms']}ms ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(module)
+    return regressions
+
+
+# python -m Benchmarks.import_time [--save baseline.json] [--baseline baseline.json]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold import-time benchmark (python -X importtime)")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--baseline", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs baseline (fraction)")
+    args = parser.parse_args()
+
+    results = run(args.modules, args.repeat)
+    for module, result in results.items():
+        if "error" in result:
+            print(f"❌ {result['error']}")
+            continue
+        loaded = ", ".join(result["loaded"]) or "none"
+        print(f"⏱️ {module}: median {result['median_ms']}ms (min {result['min_ms']}ms), heavy deps loaded: {loaded}")
+        for name, ms in result["slowest"][:5]:
+            print(f"   {ms:>9.2f}ms  {name}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ Import time regressed for: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,244 @@
+import argparse
+import contextlib
+import json
+import logging
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import Agents.agent as agent_module
+import Database.db as db
+from Agents.agent import AdmissionOfficer
+from Agents.cache import ResponseCache
+from Agents.metrics import metrics, record_llm_call, span
+from Agents.semantic_cache import SemanticQueryCache
+from Benchmarks.fakes import FakeOllamaLLM, InMemoryClient, make_profiles
+from Database.name_index import name_index
+from Database.profile import StudentProfile
+from Models.llm import count_tokens
+
+# One representative question per intent, all resolved by the local classifier
+INTENT_QUERIES = {
+    "eligibility": "Am I eligible for admission with my marks?",
+    "loan": "Can I get a student loan?",
+    "document": "Are my documents complete?",
+    "counselling": "Which course should I choose?",
+}
+
+# Two LLM-backed intents in one question, answered concurrently
+COMPOUND_QUERY = "Am I eligible with my marks, and which career or course should I choose?"
+
+# Bag-of-words similarity (see Benchmarks.fakes.word_cosine) scores paraphrases lower than
+# a real embedding model, so the benchmark's similar-query cache uses a looser threshold
+BENCH_SIMILARITY_THRESHOLD = 0.85
+BENCH_QUERY_CACHE_COLLECTION = "bench_query_cache"
+
+
+class OfflineAdmissionOfficer(AdmissionOfficer):
+    """Runs LLM plans as a single prompt against the shared (fake) LLM instead of a CrewAI crew."""
+
+    def kickoff_plan(self, intent, plan):
+        prompt = self.build_prompt(intent, plan)
+        with span(f"llm.crew.{intent}"):
+            result = agent_module.get_llm().call(prompt)
+        record_llm_call("crew", count_tokens(prompt), count_tokens(result))
+        self.log_agent_output(intent, result)
+        return result
+
+
+class StageRecorder:
+    """Collects per-stage latencies and summarizes them as throughput and percentiles."""
+
+    def __init__(self):
+        self._samples = {}
+        self._items = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def time(self, stage, items=1):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started, items)
+
+    def record(self, stage, seconds, items=1):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+            self._items[stage] = self._items.get(stage, 0) + items
+
+    def summary(self):
+        result = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            total = sum(ordered)
+            result[stage] = {
+                "count": len(ordered),
+                "items": self._items[stage],
+                "total_s": round(total, 4),
+                "throughput_per_s": round(self._items[stage] / total, 2) if total else None,
+                "mean_ms": round(total / len(ordered) * 1000, 3),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+            }
+        return result
+
+
+def percentile(ordered, pct):
+    # Nearest-rank percentile over an already sorted list
+    if not ordered:
+        return 0.0
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def install_fakes(llm, chroma_latency=0.0):
+    """Points the agents at `llm` and Database.db at an in-memory Chroma stand-in."""
+    agent_module.set_llm(llm)
+    db.connection = db.ChromaConnection(client_factory=InMemoryClient(latency=chroma_latency))
+
+
+def bench_database(recorder, profiles, lookups, chunk_size, rng):
+    for profile in profiles:
+        with recorder.time("db.add_student_data"):
+            db.add_student_data(profile)
+
+    renamed = [dict(p, name=f"Bulk {p['name']}") for p in profiles]
+    with recorder.time("db.bulk_upsert_students", items=len(renamed)):
+        db.bulk_upsert_students(renamed, chunk_size=chunk_size)
+
+    names = [p["name"] for p in profiles]
+    for _ in range(lookups):
+        name = rng.choice(names)
+        with recorder.time("db.get_student_by_name"):
+            db.get_student_by_name(name)
+
+    # Autocomplete and typo suggestions, served from memory
+    db.load_name_index()
+    for _ in range(lookups):
+        name = rng.choice(names)
+        with recorder.time("name_index.complete"):
+            name_index.complete(name[:3])
+        with recorder.time("name_index.suggest"):
+            name_index.suggest(name[:-1] + "x")
+
+
+def bench_queries(recorder, profiles, queries_per_intent, threads, rng):
+    officer = OfflineAdmissionOfficer(cache=None, semantic_cache=None)
+    cached_officer = OfflineAdmissionOfficer(cache=ResponseCache(), semantic_cache=None)
+    similar_officer = OfflineAdmissionOfficer(cache=None, semantic_cache=SemanticQueryCache(
+        collection=BENCH_QUERY_CACHE_COLLECTION, threshold=BENCH_SIMILARITY_THRESHOLD
+    ))
+
+    def one_query(intent, query, profile):
+        with recorder.time("classify_intent"):
+            officer.classify_intent(query)
+        with recorder.time("plan_response"):
+            officer.plan_response(intent, query, StudentProfile.from_dict(profile))
+        with recorder.time(f"process_query.{intent}"):
+            officer.process_query(query, profile)
+
+    jobs = [
+        (intent, query, rng.choice(profiles))
+        for intent, query in INTENT_QUERIES.items()
+        for _ in range(queries_per_intent)
+    ]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda job: one_query(*job), jobs))
+
+    # Repeat questions against a warm response cache
+    for intent, query, profile in jobs:
+        cached_officer.process_query(query, profile)
+        with recorder.time("process_query.cached"):
+            cached_officer.process_query(query, profile)
+
+    # Both parts should take about as long as one process_query.counselling, not two
+    for _, _, profile in jobs:
+        with recorder.time("process_query.compound"):
+            officer.process_query(COMPOUND_QUERY, profile)
+
+    # Reworded repeats, answered from the similar-query cache
+    for intent, query, profile in jobs:
+        similar_officer.process_query(query, profile)
+        with recorder.time("process_query.similar"):
+            similar_officer.process_query(f"Please, {query.lower()}", profile)
+
+
+def compare(stages, baseline, tolerance, metric="p95_ms", noise_floor_ms=1.0):
+    regressions = []
+    for stage, result in stages.items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before or not before.get(metric):
+            continue
+        change = (result[metric] - before[metric]) / before[metric]
+        print(f"   {stage}: {metric} {before[metric]} -> {result[metric]} ({change:+.1%})")
+        # Sub-millisecond stages jitter by more than any sensible tolerance
+        if change > tolerance and result[metric] >= noise_floor_ms:
+            regressions.append(stage)
+    return regressions
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    llm = FakeOllamaLLM(latency=args.llm_latency, tokens_per_second=args.token_rate, reply_tokens=args.reply_tokens)
+    install_fakes(llm, args.chroma_latency)
+    logging.disable(logging.INFO)
+
+    profiles = make_profiles(args.profiles, seed=args.seed)
+    recorder = StageRecorder()
+    bench_database(recorder, profiles, args.lookups, args.chunk_size, rng)
+    bench_queries(recorder, profiles, args.queries, args.threads, rng)
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "tolerance", "noise_floor")},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "llm_calls": llm.calls,
+        "stages": recorder.summary(),
+        # In-process counters, e.g. LLM calls and prompt/response tokens per kind
+        "counters": metrics.snapshot()["counters"],
+    }
+
+
+# Offline pipeline benchmark: python -m Benchmarks.run_benchmarks --output bench.json
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark with fake Ollama and in-memory Chroma")
+    parser.add_argument("--profiles", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=10, help="queries per intent")
+    parser.add_argument("--threads", type=int, default=1, help="concurrent process_query callers")
+    parser.add_argument("--chunk-size", type=int, default=db.BULK_CHUNK_SIZE)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake time to first token (s)")
+    parser.add_argument("--token-rate", type=float, default=400.0, help="fake tokens per second")
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--chroma-latency", type=float, default=0.0, help="fake Chroma round trip (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare p95 latencies against a saved results file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown vs baseline (fraction)")
+    parser.add_argument("--noise-floor", type=float, default=1.0, help="ignore p95 regressions below this many ms")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(f"{'stage':<28}{'count':>7}{'items/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in results["stages"].items():
+        print(
+            f"{stage:<28}{stats['count']:>7}{stats['throughput_per_s'] or 0:>12.1f}"
+            f"{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results["stages"], baseline, args.tolerance, noise_floor_ms=args.noise_floor)
+        if regressions:
+            print(f"❌ p95 regressed for: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,101 @@
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+
+import Database.db as db
+from Benchmarks.fakes import make_profiles
+from Benchmarks.run_benchmarks import StageRecorder
+from Database.profile import StudentProfile
+
+DEFAULT_BACKENDS = ["sqlite", "persistent", "http"]
+
+# Written alongside, never into, the real students collection
+BENCH_COLLECTION = "bench_students"
+
+
+def make_connection(backend, directory):
+    path = None
+    if backend == "sqlite":
+        path = os.path.join(directory, "profiles.sqlite3")
+    elif backend == "persistent":
+        path = os.path.join(directory, "chroma")
+    return db.ChromaConnection(backend=backend, path=path, max_retries=0)
+
+
+def bench_backend(connection, profiles, lookups, chunk_size, rng):
+    """Loads `profiles` into BENCH_COLLECTION, then times single-profile lookups by id."""
+    recorder = StageRecorder()
+    records = [StudentProfile.from_dict(p) for p in profiles]
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        with recorder.time("upsert", items=len(chunk)):
+            connection.run(lambda collection: collection.upsert(
+                ids=[p.student_id for p in chunk],
+                documents=["student_profile"] * len(chunk),
+                metadatas=[p.to_metadata() for p in chunk]
+            ), name=BENCH_COLLECTION)
+
+    ids = [p.student_id for p in records]
+    for _ in range(lookups):
+        student_id = rng.choice(ids)
+        # Same round trip and decoding as get_student_by_name
+        with recorder.time("lookup"):
+            result = connection.run(lambda collection: collection.get(ids=[student_id]), name=BENCH_COLLECTION)
+            StudentProfile.from_metadata(result["metadatas"][0])
+    return recorder.summary()
+
+
+def run(backends=DEFAULT_BACKENDS, profiles=2000, lookups=5000, chunk_size=db.BULK_CHUNK_SIZE, seed=0):
+    data = make_profiles(profiles, seed=seed)
+    results = {}
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as directory:
+            connection = make_connection(backend, directory)
+            try:
+                connection.client()
+                results[backend] = bench_backend(connection, data, lookups, chunk_size, random.Random(seed))
+            except Exception as e:
+                # e.g. chromadb not installed, or no server listening for the http backend
+                results[backend] = {"error": f"{type(e).__name__}: {e}"}
+            finally:
+                try:
+                    connection.client().delete_collection(BENCH_COLLECTION)
+                except Exception:
+                    pass
+    return results
+
+
+# Per-lookup latency by storage backend: python -m Benchmarks.storage_backends [--backends sqlite persistent]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare profile lookup latency across storage backends")
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS)
+    parser.add_argument("--profiles", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=db.BULK_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    started = time.perf_counter()
+    results = run(args.backends, args.profiles, args.lookups, args.chunk_size, args.seed)
+    print(f"{'backend':<12}{'stage':<10}{'count':>8}{'items/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for backend, stages in results.items():
+        if "error" in stages:
+            print(f"{backend:<12}❌ {stages['error']}")
+            continue
+        for stage, stats in stages.items():
+            print(
+                f"{backend:<12}{stage:<10}{stats['count']:>8}{stats['throughput_per_s'] or 0:>12.1f}"
+                f"{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+            )
+    print(f"⏱️ Done in {time.perf_counter() - started:.1f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
@@ -0,0 +1,253 @@
+import argparse
+import json
+import logging
+from collections import Counter, namedtuple
+
+import Database.db as db
+from Agents.documents import resolve_document
+from Agents.metrics import timed
+from Agents.rules import RULES_VERSION
+from Database.profile import VERDICT_PREFIX, StudentProfile, document_flag
+
+logger = logging.getLogger(__name__)
+
+# Lookup suffixes accepted by build_where, e.g. "marks_12th__gte"
+FILTER_OPERATORS = {
+    "eq": "$eq",
+    "ne": "$ne",
+    "gt": "$gt",
+    "gte": "$gte",
+    "lt": "$lt",
+    "lte": "$lte",
+    "in": "$in",
+    "nin": "$nin",
+}
+
+NUMERIC_FIELDS = {"age": int, "marks_10th": float, "marks_12th": float, "loan_requested": float}
+
+# One page of a cohort; `next_cursor` is None on the last page
+StudentPage = namedtuple("StudentPage", ["profiles", "next_cursor"])
+
+
+def _document_flag(name):
+    doc_id = resolve_document(name)
+    if doc_id is None:
+        raise ValueError(f"unknown document: {name}")
+    return document_flag(doc_id)
+
+
+def _coerce(field, value):
+    cast = NUMERIC_FIELDS.get(field)
+    if cast is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [cast(v) for v in value]
+    return cast(value)
+
+
+def build_where(filters=None, submitted=(), missing=()):
+    """
+    Builds a Chroma `where` clause selecting a cohort of students.
+
+    Parameters:
+        filters (dict): field -> value, or "field__op" -> value with op one of
+            FILTER_OPERATORS, e.g. {"course_applied": "B.Tech CSE", "marks_12th__gte": 75}
+        submitted / missing: document names (any alias) the students must have / lack
+
+    Returns:
+        dict or None: the clause, or None to select everyone
+    """
+    clauses = []
+    for key, value in (filters or {}).items():
+        field, _, op = key.partition("__")
+        operator = FILTER_OPERATORS.get(op or "eq")
+        if operator is None:
+            raise ValueError(f"unknown filter operator: {op}")
+        clauses.append({field: {operator: _coerce(field, value)}})
+    clauses.extend({_document_flag(name): True} for name in submitted)
+    clauses.extend({_document_flag(name): False} for name in missing)
+
+    if not clauses:
+        return None
+    # Chroma rejects an $and with a single clause
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _decode(metadatas):
+    profiles = []
+    for metadata in metadatas:
+        try:
+            profiles.append(StudentProfile.from_metadata(metadata))
+        except Exception as e:
+            logger.warning("⚠️ Skipping undecodable profile name=%s: %s", metadata.get("name"), e)
+    return profiles
+
+
+@timed("db.query_students")
+def query_students(where=None, limit=db.STUDENT_PAGE_SIZE, cursor=None):
+    """
+    Returns one page of the students matching `where`.
+
+    Pass the returned `next_cursor` back as `cursor` to get the following page.
+    """
+    offset = int(cursor or 0)
+    page = db.connection.run(lambda collection: collection.get(
+        where=where,
+        limit=limit,
+        offset=offset,
+        include=["metadatas"]
+    ))
+    metadatas = (page or {}).get("metadatas") or []
+    next_cursor = offset + len(metadatas) if len(metadatas) == limit else None
+    return StudentPage(_decode(metadatas), next_cursor)
+
+
+def iter_students(where=None, page_size=db.STUDENT_PAGE_SIZE):
+    """Streams every matching StudentProfile, holding one page in memory at a time."""
+    for metadatas in db.iter_student_pages(page_size, where=where):
+        yield from _decode(metadatas)
+
+
+@timed("db.count_by")
+def count_by(field, where=None, page_size=db.STUDENT_PAGE_SIZE):
+    """Number of matching students per value of `field`, e.g. count_by("course_applied")."""
+    counts = Counter()
+    for metadatas in db.iter_student_pages(page_size, where=where):
+        counts.update(metadata.get(field) for metadata in metadatas)
+    return dict(counts)
+
+
+def _and(*clauses):
+    clauses = [clause for clause in clauses if clause]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+@timed("db.count_students")
+def count_students(where=None, page_size=db.STUDENT_PAGE_SIZE):
+    """Number of students matching `where`; pages through ids only."""
+    total = 0
+    offset = 0
+    while True:
+        page = db.connection.run(lambda collection: collection.get(
+            where=where,
+            limit=page_size,
+            offset=offset,
+            include=[]
+        ))
+        found = len((page or {}).get("ids") or [])
+        total += found
+        if found < page_size:
+            return total
+        offset += page_size
+
+
+@timed("db.count_eligibility")
+def count_eligibility(where=None, page_size=db.STUDENT_PAGE_SIZE):
+    """
+    Eligibility counts over the matching students.
+
+    Counted with `where` filters on the stored verdict_* snapshot, so no
+    profile is decoded or re-evaluated. If some matching records have no
+    snapshot for the current rules (saved before verdicts were stored, or
+    before a rules change; see --reindex), every page is screened instead.
+
+    Returns:
+        dict: {"screened", "failed", "marks_ok", "documents_complete", "loan_eligible"};
+        documents_complete is the number whose admission would be approved
+    """
+    from Workflows.admission_workflow import SUMMARY_FIELDS, screen_batch
+
+    current = _and(where, {f"{VERDICT_PREFIX}version": RULES_VERSION})
+    screened = count_students(current, page_size)
+    if screened == count_students(where, page_size):
+        totals = {"screened": screened, "failed": 0}
+        for verdict in ("marks_ok", "documents_complete", "loan_eligible"):
+            totals[verdict] = count_students(_and(current, {f"{VERDICT_PREFIX}{verdict}": True}), page_size)
+        return totals
+
+    logger.warning("⚠️ Some profiles have no verdicts for the current rules; run --reindex to count them faster")
+    totals = dict.fromkeys(SUMMARY_FIELDS, 0)
+    for metadatas in db.iter_student_pages(page_size, where=where):
+        _, counts, _ = screen_batch(metadatas)
+        for field in SUMMARY_FIELDS:
+            totals[field] += counts[field]
+    return totals
+
+
+@timed("db.reindex_students")
+def reindex_students(page_size=db.STUDENT_PAGE_SIZE, force=False):
+    """
+    Rewrites stored profiles through StudentProfile.
+
+    Records saved before numbers were stored natively, before the
+    per-document flags existed, or under an older rule set are invisible
+    to range, document and verdict filters until they are rewritten. Only
+    those are rewritten unless `force` is set.
+
+    Returns:
+        dict: {"processed", "upserted", "current", "failed": [{"record", "id", "error"}]}
+    """
+    report = {"processed": 0, "upserted": 0, "current": 0, "failed": []}
+    for ids, metadatas in db.iter_student_pages(page_size, with_ids=True):
+        chunk = []
+        for student_id, metadata in zip(ids, metadatas):
+            position = report["processed"]
+            report["processed"] += 1
+            if not force and metadata.get(f"{VERDICT_PREFIX}version") == RULES_VERSION:
+                report["current"] += 1
+                continue
+            try:
+                profile = StudentProfile.from_metadata(metadata)
+                # Rewritten under the id it is stored as, so it is not duplicated
+                chunk.append((student_id, profile.to_metadata(), position))
+            except Exception as e:
+                report["failed"].append({"record": position, "id": student_id, "error": str(e)})
+        if chunk:
+            db._upsert_chunk(chunk, report)
+    logger.info(
+        "✅ Reindex finished processed=%d upserted=%d current=%d failed=%d",
+        report["processed"], report["upserted"], report["current"], len(report["failed"])
+    )
+    return report
+
+
+def _parse_filter(text):
+    key, _, value = text.partition("=")
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    return key.strip(), value
+
+
+# Cohort queries from the command line, e.g.
+# python -m Database.cohort --filter course_applied="B.Tech CSE" --filter marks_12th__gte=75 --missing "Aadhar Card"
+# python -m Database.cohort --filter verdict_loan_eligible=true --count-by course_applied
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the students collection by metadata")
+    parser.add_argument("--filter", action="append", default=[], help="field=value or field__op=value")
+    parser.add_argument("--submitted", action="append", default=[], help="document the students must have")
+    parser.add_argument("--missing", action="append", default=[], help="document the students must lack")
+    parser.add_argument("--count-by", help="print counts per value of this field instead of profiles")
+    parser.add_argument("--eligibility", action="store_true", help="print eligibility counts instead of profiles")
+    parser.add_argument("--reindex", action="store_true", help="rewrite stored profiles so every filter works")
+    parser.add_argument("--force", action="store_true", help="with --reindex, also rewrite up-to-date profiles")
+    parser.add_argument("--page-size", type=int, default=db.STUDENT_PAGE_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.reindex:
+        result = reindex_students(args.page_size, args.force)
+        for failure in result["failed"]:
+            print(f"❌ Record {failure['record']} ({failure['id']}): {failure['error']}")
+    else:
+        where = build_where(dict(map(_parse_filter, args.filter)), args.submitted, args.missing)
+        if args.count_by:
+            print(json.dumps(count_by(args.count_by, where, args.page_size), indent=2))
+        elif args.eligibility:
+            print(json.dumps(count_eligibility(where, args.page_size), indent=2))
+        else:
+            for profile in iter_students(where, args.page_size):
+                print(json.dumps(profile.to_dict()))
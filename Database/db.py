@@ -1,94 +1,416 @@
-import chromadb
+import asyncio
+import csv
+import json
+import logging
+import os
+import threading
+import time
 
-# Connect to ChromaDB server
-client = chromadb.HttpClient(host="localhost", port=8000)
+from Agents.cache import invalidate_student_responses
+from Agents.memory import forget_student_conversation
+from Agents.metrics import metrics, timed
+from Agents.semantic_cache import QUERY_CACHE_COLLECTION, forget_student_queries
+from Database.name_index import name_index
+from Database.profile import StudentProfile, student_id_for
 
-# Get or create collection
+# Chroma server connection settings
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+CHROMA_TIMEOUT = float(os.getenv("CHROMA_TIMEOUT", "10"))
+CHROMA_MAX_RETRIES = int(os.getenv("CHROMA_MAX_RETRIES", "3"))
+CHROMA_RETRY_BACKOFF = float(os.getenv("CHROMA_RETRY_BACKOFF", "0.5"))
+
+# Storage backend: "http" (Chroma server above), "persistent" (embedded Chroma reading
+# CHROMA_PATH in-process; don't run a server on the same directory) or "sqlite"
+# (key-value profile store at SQLITE_PATH, without vector search)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "http")
+CHROMA_PATH = os.getenv("CHROMA_PATH", "chroma_data")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "profiles.sqlite3")
+
+STUDENT_COLLECTION = "students"
+FAQ_COLLECTION = "faq"
+
+# Creation settings per collection; FAQ and query-cache similarity scores are cosine-based
+COLLECTION_METADATA = {
+    FAQ_COLLECTION: {"hnsw:space": "cosine"},
+    QUERY_CACHE_COLLECTION: {"hnsw:space": "cosine"},
+}
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the server went away, as opposed to a bad request
+_RETRYABLE_ERRORS = (ConnectionError, TimeoutError, OSError)
+try:
+    import httpx
+    _RETRYABLE_ERRORS += (httpx.TransportError,)
+except ImportError:
+    pass
+
+
+class StorageError(Exception):
+    """Raised when a profile can't be read because the store is unavailable, as opposed to missing."""
+
+
+class ChromaConnection:
+    """
+    Lazily connects to the storage backend and caches collection handles.
+
+    Handles are shared across calls and threads. When an operation fails
+    because the server is unreachable (or restarted and lost the collection),
+    the client is rebuilt and the operation retried with exponential backoff.
+    """
+
+    def __init__(self, host=CHROMA_HOST, port=CHROMA_PORT, timeout=CHROMA_TIMEOUT,
+                 max_retries=CHROMA_MAX_RETRIES, backoff=CHROMA_RETRY_BACKOFF, client_factory=None,
+                 backend=STORAGE_BACKEND, path=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backend = backend
+        # Data location for the persistent and sqlite backends
+        self.path = path
+        # Callable returning a client; defaults to the one for `backend`
+        self.client_factory = client_factory or self._backend_client_factory(backend)
+        self._client = None
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.client_factory()
+        return self._client
+
+    def _backend_client_factory(self, backend):
+        factories = {
+            "http": self._http_client,
+            "persistent": self._persistent_client,
+            "sqlite": self._sqlite_client,
+        }
+        if backend not in factories:
+            raise ValueError(f"unknown storage backend: {backend} (expected one of {', '.join(factories)})")
+        return factories[backend]
+
+    def _http_client(self):
+        import chromadb
+
+        client = chromadb.HttpClient(host=self.host, port=self.port)
+        _apply_timeout(client, self.timeout)
+        return client
+
+    def _persistent_client(self):
+        import chromadb
+
+        return chromadb.PersistentClient(path=self.path or CHROMA_PATH)
+
+    def _sqlite_client(self):
+        from Database.sqlite_store import SqliteClient
+
+        return SqliteClient(self.path or SQLITE_PATH)
+
+    @property
+    def supports_query(self):
+        """Whether collections can be searched by similarity; the sqlite backend has no vector index."""
+        return getattr(self.client(), "supports_query", True)
+
+    def collection(self, name=STUDENT_COLLECTION):
+        collection = self._collections.get(name)
+        if collection is None:
+            client = self.client()
+            with self._lock:
+                collection = self._collections.get(name)
+                if collection is None:
+                    collection = client.get_or_create_collection(name=name, metadata=COLLECTION_METADATA.get(name))
+                    self._collections[name] = collection
+        return collection
+
+    def reset(self):
+        with self._lock:
+            self._client = None
+            self._collections.clear()
+
+    def run(self, operation, name=STUDENT_COLLECTION):
+        """Calls operation(collection), reconnecting with backoff if the server is unavailable."""
+        attempt = 0
+        while True:
+            try:
+                return operation(self.collection(name))
+            except Exception as e:
+                retryable = isinstance(e, _RETRYABLE_ERRORS) or "does not exist" in str(e).lower()
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                logger.warning("⚠️ Chroma unavailable (%s), reconnecting in %.1fs attempt=%d", e, delay, attempt + 1)
+                metrics.increment("chroma_reconnects")
+                time.sleep(delay)
+                self.reset()
+                attempt += 1
+
+    def health_check(self):
+        try:
+            self.client().heartbeat()
+            return True
+        except Exception as e:
+            logger.error("❌ Chroma health check failed: %s", e)
+            self.reset()
+            return False
+
+
+def _apply_timeout(client, timeout):
+    # The HTTP client does not take a timeout argument; set it on its session when exposed
+    session = getattr(getattr(client, "_server", None), "_session", None)
+    if session is not None and hasattr(session, "timeout"):
+        try:
+            session.timeout = timeout
+        except Exception:
+            pass
+
+
+connection = ChromaConnection()
+
+
+# Get or create collection (resolved once, then reused)
 def get_student_collection():
-    return client.get_or_create_collection(name="students")
+    return connection.collection(STUDENT_COLLECTION)
 
-# Add or update student data
+# Add or update student data (a StudentProfile or a plain dict)
+@timed("db.add_student_data")
 def add_student_data(data):
-    collection = get_student_collection()
-    student_id = data["name"].lower()
+    profile = StudentProfile.from_dict(data)
+    # A profile stored under an older id format is updated in place, not duplicated
+    student_id = resolve_student_id(profile.name)
 
-    # Step 1: Delete old record
-    try:
-        collection.delete(ids=[student_id])
-        print(f"✅ Deleted old profile for: {student_id}")
-    except Exception as e:
-        print(f"⚠️ Couldn't delete existing record (maybe doesn't exist): {e}")
-
-    # Step 2: Sanitize and convert all fields
-    sanitized_data = {}
-    for key, value in data.items():
-        if isinstance(value, list):
-            sanitized_data[key] = ", ".join(value)  # convert list to string
-        elif isinstance(value, bool):
-            sanitized_data[key] = str(value)  # convert bool to string
-        elif isinstance(value, (int, float)):
-            sanitized_data[key] = str(value)  # convert numbers to string
-        else:
-            sanitized_data[key] = value  # assume already string
-
-    # Step 3: Log what is being saved
-    print(f"✅ Saving updated profile for {student_id}:")
-    for k, v in sanitized_data.items():
-        print(f"   {k}: {v}")
-
-    # Step 4: Save it
-    collection.add(
+    # Step 1: Encode to Chroma metadata
+    metadata = profile.to_metadata()
+
+    # Step 2: Log what is being saved (field values only at DEBUG)
+    logger.info("✅ Saving profile student_id=%s fields=%d", student_id, len(metadata))
+    logger.debug("Profile fields student_id=%s metadata=%s", student_id, metadata)
+
+    # Step 3: Upsert replaces the old record in a single round trip
+    connection.run(lambda collection: collection.upsert(
         ids=[student_id],
         documents=["student_profile"],
-        metadatas=[sanitized_data]
-    )
+        metadatas=[metadata]
+    ))
 
+    # Cached chat answers were computed from the old profile
+    invalidate_student_responses(profile.student_id)
+    name_index.add(student_id, profile.name)
 
-# Retrieve student data by name
-def get_student_by_name(name):
-    collection = get_student_collection()
-    student_id = name.lower()
 
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+
+# Stream profiles from a CSV file with a header row
+def iter_students_from_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row
+
+
+# Stream profiles from a JSON-lines file
+def iter_students_from_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_students_from_file(path):
+    if path.lower().endswith(".csv"):
+        return iter_students_from_csv(path)
+    return iter_students_from_jsonl(path)
+
+
+@timed("db.upsert_chunk")
+def _upsert_chunk(chunk, report):
+    ids = [student_id for student_id, _, _ in chunk]
+    metadatas = [metadata for _, metadata, _ in chunk]
+    # Positions of this chunk's records that weren't saved
+    failed = set()
+    try:
+        connection.run(lambda collection: collection.upsert(
+            ids=ids,
+            documents=["student_profile"] * len(ids),
+            metadatas=metadatas
+        ))
+        report["upserted"] += len(ids)
+    except Exception:
+        # Isolate the bad record(s) so one failure doesn't sink the whole chunk
+        for student_id, metadata, position in chunk:
+            try:
+                connection.run(lambda collection: collection.upsert(
+                    ids=[student_id],
+                    documents=["student_profile"],
+                    metadatas=[metadata]
+                ))
+                report["upserted"] += 1
+            except Exception as e:
+                failed.add(position)
+                report["failed"].append({"record": position, "id": student_id_for(metadata["name"]), "error": str(e)})
+    for student_id, metadata, position in chunk:
+        invalidate_student_responses(student_id_for(metadata["name"]))
+        if position not in failed:
+            name_index.add(student_id, metadata["name"])
+
+
+def _failed_record_id(raw, position):
+    # The id the record would have been saved under, or its position when it has no usable name
     try:
-        result = collection.get(ids=[student_id])
-        if result and "metadatas" in result and result["metadatas"]:
-            metadata = result["metadatas"][0]
+        return student_id_for(raw["name"])
+    except Exception:
+        return position
+
+
+@timed("db.bulk_upsert_students")
+def bulk_upsert_students(records, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Streams student profiles into Chroma in batched upserts.
+
+    `records` may be any iterable of profile dicts (e.g. iter_students_from_file(path));
+    it is consumed lazily, chunk_size records at a time. Records that fail to
+    parse or save are reported and skipped without aborting the import.
+
+    Returns:
+        dict: {"processed", "upserted", "failed": [{"record", "id", "error"}]}
+    """
+    report = {"processed": 0, "upserted": 0, "failed": []}
+    chunk = {}
+
+    for position, raw in enumerate(records):
+        report["processed"] += 1
+        try:
+            if not isinstance(raw, dict):
+                raise ValueError(f"expected an object, got {type(raw).__name__}")
+            profile = StudentProfile.from_dict(raw)
+            student_id = resolve_student_id(profile.name)
+            # Later rows for the same student win, as with sequential saves
+            chunk[student_id] = (student_id, profile.to_metadata(), position)
+        except Exception as e:
+            report["failed"].append({"record": position, "id": _failed_record_id(raw, position), "error": str(e)})
+            continue
+
+        if len(chunk) >= chunk_size:
+            _upsert_chunk(list(chunk.values()), report)
+            chunk = {}
+
+    if chunk:
+        _upsert_chunk(list(chunk.values()), report)
 
-            # Convert documents_submitted back to list
-            if "documents_submitted" in metadata and isinstance(metadata["documents_submitted"], str):
-                metadata["documents_submitted"] = [doc.strip() for doc in metadata["documents_submitted"].split(",")]
+    logger.info(
+        "✅ Bulk import finished processed=%d upserted=%d failed=%d",
+        report["processed"], report["upserted"], len(report["failed"])
+    )
+    return report
+
+
+STUDENT_PAGE_SIZE = int(os.getenv("STUDENT_PAGE_SIZE", "1000"))
 
-            # Convert numeric values back to their types
-            for key in ["marks_10th", "marks_12th", "loan_requested"]:
-                if key in metadata and isinstance(metadata[key], str):
-                    try:
-                        metadata[key] = float(metadata[key])
-                    except:
-                        metadata[key] = 0.0
 
-            if "age" in metadata and isinstance(metadata["age"], str):
-                try:
-                    metadata["age"] = int(metadata["age"])
-                except:
-                    metadata["age"] = 0
+# Stream the stored metadata of every profile (or those matching a `where`
+# filter), page_size records per round trip; with_ids yields (ids, metadatas)
+def iter_student_pages(page_size=STUDENT_PAGE_SIZE, where=None, with_ids=False):
+    offset = 0
+    while True:
+        with metrics.span("db.get_page"):
+            page = connection.run(lambda collection: collection.get(
+                where=where,
+                limit=page_size,
+                offset=offset,
+                include=["metadatas"]
+            ))
+        metadatas = (page or {}).get("metadatas") or []
+        if not metadatas:
+            return
+        yield (page["ids"], metadatas) if with_ids else metadatas
+        if len(metadatas) < page_size:
+            return
+        offset += page_size
 
-            if "income_certificate" in metadata and isinstance(metadata["income_certificate"], str):
-                metadata["income_certificate"] = metadata["income_certificate"].lower() == "true"
 
-            return metadata
+def resolve_student_id(name):
+    # Records saved before ids were spacing-insensitive are found through the name index
+    return name_index.resolve(name) or student_id_for(name)
 
+
+# Retrieve student data by name, ignoring case and spacing
+@timed("db.get_student_by_name")
+def get_student_by_name(name):
+    student_id = resolve_student_id(name)
+
+    try:
+        result = connection.run(lambda collection: collection.get(ids=[student_id]))
     except Exception as e:
-        print("❌ Error in get_student_by_name():", e)
+        # Not None: an outage must not look like an unknown student
+        logger.error("❌ Error in get_student_by_name() student_id=%s: %s", student_id, e)
+        raise StorageError(f"profile store unavailable: {e}") from e
 
+    if result and "metadatas" in result and result["metadatas"]:
+        return StudentProfile.from_metadata(result["metadatas"][0])
     return None
 
 # Delete student profile
+@timed("db.delete_student_by_name")
 def delete_student_by_name(name):
-    collection = get_student_collection()
-    student_id = name.lower()
+    student_id = resolve_student_id(name)
+    # Cached answers and conversations are keyed by the normalized id, not the stored one
+    cache_id = student_id_for(name)
 
     try:
-        collection.delete(ids=[student_id])
-        print(f"✅ Deleted student profile for '{name}'")
+        connection.run(lambda collection: collection.delete(ids=[student_id]))
+        logger.info("✅ Deleted student profile student_id=%s", student_id)
+        # Only once it is gone: a failed delete leaves the profile findable
+        name_index.remove(student_id)
     except Exception as e:
-        print(f"❌ Failed to delete student '{name}': {e}")
+        logger.error("❌ Failed to delete student student_id=%s: %s", student_id, e)
+    finally:
+        invalidate_student_responses(cache_id)
+        forget_student_conversation(cache_id)
+        forget_student_queries(cache_id)
+
+
+@timed("db.load_name_index")
+def load_name_index(page_size=STUDENT_PAGE_SIZE):
+    """
+    Rebuilds name_index from every stored profile.
+
+    Saves and deletes through this process keep the index current on their
+    own. Changes made by other processes (backend replicas, bulk imports
+    from the command line) only appear after this runs again; the backend
+    runs it at startup and every NAME_INDEX_REFRESH seconds.
+    """
+    def entries():
+        for ids, metadatas in iter_student_pages(page_size, with_ids=True):
+            for student_id, metadata in zip(ids, metadatas):
+                yield student_id, str((metadata or {}).get("name") or "").strip()
+
+    name_index.load(entries())
+    return name_index
+
+
+# Async wrappers for event-loop callers: the Chroma client blocks, so run it in a worker thread
+async def aget_student_by_name(name):
+    return await asyncio.to_thread(get_student_by_name, name)
+
+
+async def aadd_student_data(data):
+    return await asyncio.to_thread(add_student_data, data)
+
+
+async def adelete_student_by_name(name):
+    return await asyncio.to_thread(delete_student_by_name, name)
+
+# Bulk import from the command line: python -m Database.db students.csv [chunk_size]
+# (a running backend suggests the imported names after its next name index refresh)
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else BULK_CHUNK_SIZE
+    result = bulk_upsert_students(iter_students_from_file(sys.argv[1]), chunk_size=size)
+    for failure in result["failed"]:
+        print(f"❌ Record {failure['record']} ({failure['id']}): {failure['error']}")
@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import os
+from collections import namedtuple
+
+import Database.db as db
+from Agents.metrics import metrics, timed
+from Models.llm import truncate_tokens
+
+# Passages retrieved per counselling query
+FAQ_TOP_K = int(os.getenv("FAQ_TOP_K", "3"))
+# Matches below this cosine similarity are not worth putting in front of the model
+FAQ_MIN_SIMILARITY = float(os.getenv("FAQ_MIN_SIMILARITY", "0.35"))
+# A stored answer at least this similar is returned as-is, without an LLM call
+FAQ_ANSWER_SIMILARITY = float(os.getenv("FAQ_ANSWER_SIMILARITY", "0.85"))
+# Longest passage included in a prompt
+FAQ_PASSAGE_TOKENS = int(os.getenv("FAQ_PASSAGE_TOKENS", "80"))
+
+logger = logging.getLogger(__name__)
+
+FaqMatch = namedtuple("FaqMatch", ["id", "question", "answer", "topic", "text", "similarity"])
+
+
+def faq_id(entry):
+    key = entry.get("question") or entry.get("text") or ""
+    return entry.get("id") or "faq-" + hashlib.blake2b(key.strip().lower().encode("utf-8"), digest_size=8).hexdigest()
+
+
+def faq_record(entry):
+    """
+    Encodes one FAQ entry as (id, document to embed, metadata).
+
+    Entries are either {"question", "answer"} pairs, embedded by question so
+    student queries match them closely, or free-text {"text"} passages used
+    only as grounding. "topic" and "id" are optional.
+    """
+    question = str(entry.get("question") or "").strip()
+    answer = str(entry.get("answer") or "").strip()
+    text = str(entry.get("text") or "").strip()
+    if not (question and answer) and not text:
+        raise ValueError("FAQ entry needs a question and answer, or a text passage")
+
+    document = question or text
+    content_hash = hashlib.blake2b(f"{question}\x1f{answer}\x1f{text}".encode("utf-8"), digest_size=12).hexdigest()
+    metadata = {
+        "question": question,
+        "answer": answer,
+        "text": text,
+        "topic": str(entry.get("topic") or ""),
+        "content_hash": content_hash,
+    }
+    return faq_id(entry), document, metadata
+
+
+def passage(match, max_tokens=FAQ_PASSAGE_TOKENS):
+    text = f"Q: {match.question} A: {match.answer}" if match.question else match.text
+    return truncate_tokens(text, max_tokens)
+
+
+class FaqKnowledgeBase:
+    """
+    FAQ and course/fee/deadline passages in their own Chroma collection.
+
+    Entries are embedded by Chroma when they are upserted; re-ingesting a
+    file only re-embeds entries whose content changed.
+    """
+
+    def __init__(self, collection=db.FAQ_COLLECTION, connection=None):
+        self.collection = collection
+        # Defaults to Database.db.connection, looked up per call so it can be swapped
+        self._connection = connection
+
+    @property
+    def connection(self):
+        return self._connection or db.connection
+
+    def _run(self, operation):
+        return self.connection.run(operation, name=self.collection)
+
+    def _upsert_chunk(self, chunk, report):
+        ids = [record[0] for record in chunk]
+        stored = self._run(lambda collection: collection.get(ids=ids, include=["metadatas"]))
+        stored_hashes = {
+            stored_id: (metadata or {}).get("content_hash")
+            for stored_id, metadata in zip(stored.get("ids") or [], stored.get("metadatas") or [])
+        }
+        changed = [record for record in chunk if stored_hashes.get(record[0]) != record[2]["content_hash"]]
+        report["unchanged"] += len(chunk) - len(changed)
+        if not changed:
+            return
+        self._run(lambda collection: collection.upsert(
+            ids=[record[0] for record in changed],
+            documents=[record[1] for record in changed],
+            metadatas=[record[2] for record in changed]
+        ))
+        report["embedded"] += len(changed)
+
+    @timed("faq.ingest")
+    def ingest(self, entries, chunk_size=db.BULK_CHUNK_SIZE):
+        """
+        Upserts FAQ entries in batches, skipping ones already stored unchanged.
+
+        Returns:
+            dict: {"processed", "embedded", "unchanged", "failed": [{"record", "id", "error"}]}
+        """
+        report = {"processed": 0, "embedded": 0, "unchanged": 0, "failed": []}
+        chunk = {}
+        for position, entry in enumerate(entries):
+            report["processed"] += 1
+            try:
+                record = faq_record(entry)
+            except Exception as e:
+                report["failed"].append({"record": position, "id": entry.get("id"), "error": str(e)})
+                continue
+            chunk[record[0]] = record
+            if len(chunk) >= chunk_size:
+                self._upsert_chunk(list(chunk.values()), report)
+                chunk = {}
+        if chunk:
+            self._upsert_chunk(list(chunk.values()), report)
+
+        logger.info(
+            "✅ FAQ ingestion finished processed=%d embedded=%d unchanged=%d failed=%d",
+            report["processed"], report["embedded"], report["unchanged"], len(report["failed"])
+        )
+        return report
+
+    @timed("faq.search")
+    def search(self, query, k=FAQ_TOP_K, min_similarity=FAQ_MIN_SIMILARITY):
+        """Top `k` entries for `query` with similarity >= min_similarity, best first."""
+        if not self.connection.supports_query:
+            # No vector index on this backend: answer without grounding
+            return []
+        result = self._run(lambda collection: collection.query(
+            query_texts=[query],
+            n_results=k,
+            include=["metadatas", "distances"]
+        ))
+        ids = (result.get("ids") or [[]])[0]
+        metadatas = (result.get("metadatas") or [[]])[0]
+        distances = (result.get("distances") or [[]])[0]
+
+        matches = []
+        for match_id, metadata, distance in zip(ids, metadatas, distances):
+            similarity = 1.0 - distance
+            if similarity < min_similarity:
+                continue
+            metadata = metadata or {}
+            matches.append(FaqMatch(
+                match_id,
+                metadata.get("question", ""),
+                metadata.get("answer", ""),
+                metadata.get("topic", ""),
+                metadata.get("text", ""),
+                round(similarity, 4),
+            ))
+        metrics.increment("faq_searches", 1, "hit" if matches else "miss")
+        return matches
+
+    def delete(self, ids):
+        self._run(lambda collection: collection.delete(ids=list(ids)))
+
+
+# Shared by every AdmissionOfficer
+faq_knowledge_base = FaqKnowledgeBase()
+
+
+# Load FAQs from the command line: python -m Database.knowledge faq.jsonl [chunk_size]
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else db.BULK_CHUNK_SIZE
+    # Same CSV / JSON-lines readers as the student import
+    result = faq_knowledge_base.ingest(db.iter_students_from_file(sys.argv[1]), chunk_size=size)
+    for failure in result["failed"]:
+        print(f"❌ Record {failure['record']} ({failure['id']}): {failure['error']}")
@@ -0,0 +1,245 @@
+import bisect
+import heapq
+import logging
+import os
+import threading
+
+from Agents.metrics import timed
+
+# Largest edit distance (insertions, deletions, substitutions) still offered as "did you mean"
+NAME_FUZZY_DISTANCE = int(os.getenv("NAME_FUZZY_DISTANCE", "2"))
+NAME_SUGGESTIONS = int(os.getenv("NAME_SUGGESTIONS", "5"))
+# Most names scored per fuzzy lookup, closest words first, so a very common word stays cheap
+NAME_FUZZY_CANDIDATES = int(os.getenv("NAME_FUZZY_CANDIDATES", "2000"))
+# Seconds between rebuilds from storage, picking up writes made by other processes; 0 disables
+NAME_INDEX_REFRESH = float(os.getenv("NAME_INDEX_REFRESH", "300"))
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_name(name):
+    """Case- and spacing-insensitive form of a name: "  ann  LEE " -> "ann lee"."""
+    return " ".join(str(name).casefold().split())
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Edits (insertions, deletions, substitutions, adjacent swaps) turning a into b,
+    or max_distance + 1 once it is known to exceed max_distance.
+    """
+    too_far = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return too_far
+    # Only cells within max_distance of the diagonal can stay under the bound
+    before = None
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [too_far] * (len(b) + 1)
+        if i <= max_distance:
+            current[0] = i
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            char_b = b[j - 1]
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if before is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)
+            current[j] = min(cost, too_far)
+        if min(current) > max_distance:
+            return too_far
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(token, depth):
+    """`token` with up to `depth` characters removed (the symmetric-delete trick for typo lookup)."""
+    variants = {token}
+    frontier = {token}
+    for _ in range(depth):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    variants.discard("")
+    return variants
+
+
+class NameIndex:
+    """
+    In-memory index of student names for exact, prefix and typo-tolerant lookup.
+
+    Names are normalized with normalize_name. Prefix lookups bisect a sorted
+    list holding every name once per word, so "lee" finds "Ann Lee" too.
+    Fuzzy lookups go through a symmetric-delete index of the words: a query
+    word and a stored word within NAME_FUZZY_DISTANCE edits share a variant
+    with characters deleted, so only names whose words all share such a
+    variant are scored. Nothing here touches Chroma.
+    """
+
+    def __init__(self, max_distance=NAME_FUZZY_DISTANCE):
+        self.max_distance = max_distance
+        self._lock = threading.RLock()
+        self._names = {}        # student_id -> stored display name
+        self._ids = {}          # normalized name -> student_id
+        self._prefixes = []     # sorted (normalized name from one of its words on, student_id)
+        self._word_ids = {}     # word -> {student_id}
+        self._variants = {}     # word with characters deleted -> {word}
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._names)
+
+    def _prefix_keys(self, normalized):
+        words = normalized.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def add(self, student_id, name, _sorted=True):
+        with self._lock:
+            if student_id in self._names:
+                self.remove(student_id)
+            normalized = normalize_name(name)
+            self._names[student_id] = name
+            self._ids[normalized] = student_id
+            for key in self._prefix_keys(normalized):
+                if _sorted:
+                    bisect.insort(self._prefixes, (key, student_id))
+                else:
+                    self._prefixes.append((key, student_id))
+            for word in normalized.split(" "):
+                ids = self._word_ids.setdefault(word, set())
+                if not ids:
+                    for variant in _deletes(word, self.max_distance):
+                        self._variants.setdefault(variant, set()).add(word)
+                ids.add(student_id)
+
+    def remove(self, student_id):
+        with self._lock:
+            name = self._names.pop(student_id, None)
+            if name is None:
+                return
+            normalized = normalize_name(name)
+            if self._ids.get(normalized) == student_id:
+                del self._ids[normalized]
+            for key in self._prefix_keys(normalized):
+                position = bisect.bisect_left(self._prefixes, (key, student_id))
+                if position < len(self._prefixes) and self._prefixes[position] == (key, student_id):
+                    del self._prefixes[position]
+            for word in set(normalized.split(" ")):
+                ids = self._word_ids.get(word)
+                if ids is None:
+                    continue
+                ids.discard(student_id)
+                if ids:
+                    continue
+                del self._word_ids[word]
+                for variant in _deletes(word, self.max_distance):
+                    words = self._variants.get(variant)
+                    if words is not None:
+                        words.discard(word)
+                        if not words:
+                            del self._variants[variant]
+
+    def resolve(self, name):
+        """The stored student id for `name` regardless of case and spacing, or None."""
+        with self._lock:
+            return self._ids.get(normalize_name(name))
+
+    def complete(self, prefix, limit=NAME_SUGGESTIONS):
+        """Stored names having a word that starts with `prefix`, in alphabetical order."""
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+        names = []
+        seen = set()
+        with self._lock:
+            position = bisect.bisect_left(self._prefixes, (prefix,))
+            while position < len(self._prefixes) and len(names) < limit:
+                key, student_id = self._prefixes[position]
+                if not key.startswith(prefix):
+                    break
+                if student_id not in seen:
+                    seen.add(student_id)
+                    names.append(self._names[student_id])
+                position += 1
+        return names
+
+    def similar(self, name, limit=NAME_SUGGESTIONS, max_distance=None):
+        """
+        [(stored name, edits)] for names whose words are each a few edits from a
+        word of `name`, at most max_distance edits in total, closest first.
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        with self._lock:
+            close = [self._close_words(word, max_distance) for word in normalize_name(name).split(" ")]
+            if not close or not all(close):
+                return []
+            # Every word must be close, so seed with the rarest one: a common surname
+            # alone doesn't make everyone a candidate
+            close.sort(key=lambda words: sum(len(self._word_ids[word]) for word in words))
+            distances = {}      # student_id -> edits summed over the words so far
+            for stored_word, distance in sorted(close[0].items(), key=lambda item: item[1]):
+                for student_id in self._word_ids[stored_word]:
+                    if len(distances) >= NAME_FUZZY_CANDIDATES:
+                        break
+                    distances.setdefault(student_id, distance)
+            for words in close[1:]:
+                by_distance = sorted(words.items(), key=lambda item: item[1])
+                narrowed = {}
+                for student_id, total in distances.items():
+                    for stored_word, distance in by_distance:
+                        if student_id in self._word_ids[stored_word]:
+                            narrowed[student_id] = total + distance
+                            break
+                distances = narrowed
+                if not distances:
+                    return []
+            scored = heapq.nsmallest(limit, (
+                (distance, self._names[student_id])
+                for student_id, distance in distances.items()
+                if distance <= max_distance
+            ))
+        return [(stored, distance) for distance, stored in scored]
+
+    def _close_words(self, word, max_distance):
+        """{stored word: edits} for the stored words close enough to `word`."""
+        # Two edits on a short word match nearly every other short word; scale tolerance with length
+        tolerance = min(max_distance, len(word) // 3)
+        candidates = set()
+        for variant in _deletes(word, tolerance):
+            candidates.update(self._variants.get(variant, ()))
+        # A shared variant only bounds the distance at twice the tolerance; check the words themselves
+        words = {}
+        for stored_word in candidates:
+            distance = edit_distance(word, stored_word, tolerance)
+            if distance <= tolerance:
+                words[stored_word] = distance
+        return words
+
+    @timed("name_index.suggest")
+    def suggest(self, text, limit=NAME_SUGGESTIONS):
+        """Autocomplete matches for `text`, topped up with near misses when there are few."""
+        names = self.complete(text, limit)
+        if len(names) < limit:
+            for stored, _ in self.similar(text, limit):
+                if stored not in names:
+                    names.append(stored)
+        return names[:limit]
+
+    @timed("name_index.load")
+    def load(self, entries):
+        """Replaces the index with (student_id, name) pairs, e.g. every stored profile."""
+        # Built aside and swapped in, so lookups carry on while storage is paged through
+        fresh = NameIndex(self.max_distance)
+        for student_id, name in entries:
+            if name:
+                fresh.add(student_id, name, _sorted=False)
+        # One sort instead of an insort per name
+        fresh._prefixes.sort()
+        with self._lock:
+            self._names = fresh._names
+            self._ids = fresh._ids
+            self._prefixes = fresh._prefixes
+            self._word_ids = fresh._word_ids
+            self._variants = fresh._variants
+            self.loaded = True
+        logger.info("✅ Name index loaded names=%d", len(self))
+
+
+# Maintained by Database.db on every save and delete in this process; rebuilt by db.load_name_index
+name_index = NameIndex()
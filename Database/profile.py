@@ -0,0 +1,217 @@
+from dataclasses import dataclass, field, fields, replace
+
+from Agents.documents import DOCUMENT_LABELS, document_ids
+from Agents.rules import RULES_VERSION, Eligibility, evaluate
+
+# Separator used to store documents_submitted as a single metadata string
+DOCUMENT_SEPARATOR = ", "
+
+# Chroma can't filter on part of a string, so each known document is also stored
+# as a boolean "doc_<id>" flag; these are derived on write and ignored on read
+DOCUMENT_FLAG_PREFIX = "doc_"
+DOCUMENT_FLAGS = {f"{DOCUMENT_FLAG_PREFIX}{doc_id}": doc_id for doc_id in DOCUMENT_LABELS}
+
+# Eligibility verdicts are computed on write and stored as "verdict_<name>" keys, so
+# reads skip the rules and Chroma can filter on them, e.g. {"verdict_loan_eligible": True}
+VERDICT_PREFIX = "verdict_"
+VERDICT_KEYS = {f"{VERDICT_PREFIX}{name}": name for name in Eligibility._fields}
+
+_TRUE_STRINGS = ("true", "yes", "y", "1")
+
+
+def student_id_for(name):
+    # Case and spacing don't make a different student
+    return " ".join(name.split()).lower()
+
+
+def document_flag(doc_id):
+    return f"{DOCUMENT_FLAG_PREFIX}{doc_id}"
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    try:
+        return int(float(value)) if value not in (None, "") else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_float(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value) if value not in (None, "") else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_STRINGS
+    return bool(value)
+
+
+def _to_documents(value):
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.replace(";", ",").split(",")
+    return tuple(doc.strip() for doc in value if doc and doc.strip())
+
+
+def _to_str(value):
+    return "" if value is None else str(value).strip()
+
+
+def _to_metadata_value(value):
+    # Chroma metadata accepts str, int, float and bool only
+    if isinstance(value, (list, tuple)):
+        return DOCUMENT_SEPARATOR.join(str(v) for v in value)
+    if value is None:
+        return ""
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _encode_verdicts(eligibility):
+    return {key: _to_metadata_value(getattr(eligibility, name)) for key, name in VERDICT_KEYS.items()}
+
+
+def _decode_verdicts(values):
+    # Snapshots from an older rule set (or partial ones) are dropped and recomputed on use
+    if len(values) != len(VERDICT_KEYS) or _to_str(values["version"]) != RULES_VERSION:
+        return None
+    return Eligibility(**{
+        name: _VERDICT_CODERS.get(name, _to_bool)(value) for name, value in values.items()
+    })
+
+
+_VERDICT_CODERS = {
+    "version": _to_str,
+    "missing_documents": _to_documents,
+    "loan_missing_documents": _to_documents,
+}
+
+_CODERS = {
+    "name": _to_str,
+    "age": _to_int,
+    "course_applied": _to_str,
+    "marks_10th": _to_float,
+    "marks_12th": _to_float,
+    "documents_submitted": _to_documents,
+    "loan_requested": _to_float,
+    "income_certificate": _to_bool,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class StudentProfile:
+    """
+    A student's admission profile with typed fields.
+
+    This is the single codec between Chroma metadata, form/CSV input and the
+    agents: numbers and booleans are stored natively in Chroma, only the
+    document list is flattened to a string (plus one filterable flag per known
+    document). Columns outside the known fields are carried in `extra` so they
+    survive a round trip. The eligibility verdicts are computed on every
+    write and stored alongside; from_metadata keeps them in `verdicts` when
+    they were computed under the current rules.
+    """
+
+    name: str
+    age: int = 0
+    course_applied: str = ""
+    marks_10th: float = 0.0
+    marks_12th: float = 0.0
+    documents_submitted: tuple = ()
+    loan_requested: float = 0.0
+    income_certificate: bool = False
+    extra: dict = field(default=None, compare=False)
+    verdicts: Eligibility = field(default=None, compare=False, repr=False)
+
+    @property
+    def student_id(self):
+        return student_id_for(self.name)
+
+    @property
+    def eligibility(self):
+        """The stored verdicts, or ones computed now if the record has none for the current rules."""
+        return self.verdicts if self.verdicts is not None else evaluate(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Builds a profile from a dict of native or stringified values (form, CSV, JSON).
+
+        verdict_* keys are dropped: verdicts are only ever computed from the
+        fields, never taken from input.
+        """
+        return cls._decode(data, trust_verdicts=False)
+
+    @classmethod
+    def from_metadata(cls, metadata):
+        """Reads a stored record back, keeping the verdicts saved with it if they match the current rules."""
+        return cls._decode(metadata, trust_verdicts=True)
+
+    @classmethod
+    def _decode(cls, data, trust_verdicts):
+        if isinstance(data, cls):
+            return data
+        values = {}
+        extra = {}
+        verdicts = {}
+        for key, value in data.items():
+            if key is None:
+                continue
+            key = key.strip()
+            if key in DOCUMENT_FLAGS:
+                continue
+            if key in VERDICT_KEYS:
+                if trust_verdicts:
+                    verdicts[VERDICT_KEYS[key]] = value
+                continue
+            coder = _CODERS.get(key)
+            if coder is not None:
+                values[key] = coder(value)
+            elif key not in ("extra", "verdicts"):
+                extra[key] = value
+        if not values.get("name"):
+            raise ValueError("missing name")
+        return cls(**values, extra=extra or None, verdicts=_decode_verdicts(verdicts) if verdicts else None)
+
+    def to_metadata(self):
+        metadata = self._fields_metadata()
+        submitted = document_ids(self.documents_submitted)
+        for flag, doc_id in DOCUMENT_FLAGS.items():
+            metadata[flag] = doc_id in submitted
+        # Always recomputed on write, so a stale or supplied snapshot is never stored
+        metadata.update(_encode_verdicts(evaluate(self)))
+        return metadata
+
+    def _fields_metadata(self):
+        metadata = {key: _to_metadata_value(value) for key, value in (self.extra or {}).items()}
+        for f in fields(self):
+            if f.name in ("extra", "verdicts"):
+                continue
+            metadata[f.name] = getattr(self, f.name)
+        metadata["documents_submitted"] = DOCUMENT_SEPARATOR.join(self.documents_submitted)
+        return metadata
+
+    def to_dict(self):
+        data = self._fields_metadata()
+        data["documents_submitted"] = list(self.documents_submitted)
+        return data
+
+    def replace(self, **changes):
+        for key, value in changes.items():
+            if key in _CODERS:
+                changes[key] = _CODERS[key](value)
+        # Verdicts are recomputed from the new fields (memoized, so unchanged ones are free)
+        changes.setdefault("verdicts", None)
+        return replace(self, **changes)
@@ -0,0 +1,169 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    document TEXT,
+    metadata TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+)
+"""
+
+_COMPARISONS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _param(value):
+    # JSON true/false come back from json_extract as 1/0
+    return int(value) if isinstance(value, bool) else value
+
+
+def _compile_condition(field, operator, operand, params):
+    path = "'" + ("$." + json.dumps(field)).replace("'", "''") + "'"
+    value = f"json_extract(metadata, {path})"
+    if operator == "$eq":
+        params.append(_param(operand))
+        return f"{value} = ?"
+    if operator == "$ne":
+        params.append(_param(operand))
+        return f"{value} != ?"
+    if operator in _COMPARISONS:
+        params.append(_param(operand))
+        # As in Chroma, range filters only match numbers
+        return f"(json_type(metadata, {path}) IN ('integer', 'real') AND {value} {_COMPARISONS[operator]} ?)"
+    if operator in ("$in", "$nin"):
+        if not operand:
+            return "0" if operator == "$in" else "1"
+        params.extend(_param(v) for v in operand)
+        placeholders = ", ".join("?" * len(operand))
+        return f"{value} {'IN' if operator == '$in' else 'NOT IN'} ({placeholders})"
+    raise ValueError(f"unsupported where operator: {operator}")
+
+
+def compile_where(where, params):
+    """Translates a Chroma `where` clause into an SQL condition, appending its parameters to `params`."""
+    clauses = []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            parts = [compile_where(clause, params) for clause in condition]
+            clauses.append("(" + (" AND " if key == "$and" else " OR ").join(parts) + ")")
+        elif isinstance(condition, dict):
+            clauses.extend(_compile_condition(key, op, operand, params) for op, operand in condition.items())
+        else:
+            clauses.append(_compile_condition(key, "$eq", condition, params))
+    return " AND ".join(clauses) or "1"
+
+
+class SqliteCollection:
+    """
+    A Chroma-compatible collection backed by one SQLite table.
+
+    Covers what Database.db and Database.cohort call: upsert, get by ids or
+    `where` filter with limit/offset, delete and count. Lookups by id use the
+    primary key; filters run as json_extract() conditions. There is no
+    embedding index, so there is no query(); see supports_query.
+    """
+
+    # No similarity search: the FAQ knowledge base and similar-query cache turn themselves off
+    supports_query = False
+
+    def __init__(self, client, name):
+        self._client = client
+        self.name = name
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None):
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+        rows = [
+            (self.name, record_id, document, json.dumps(metadata, ensure_ascii=False))
+            for record_id, document, metadata in zip(ids, documents, metadatas)
+        ]
+        with self._client.connection() as conn:
+            conn.executemany(
+                "INSERT INTO records (collection, id, document, metadata) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (collection, id) DO UPDATE SET document = excluded.document, metadata = excluded.metadata",
+                rows
+            )
+
+    add = upsert
+
+    def _select(self, columns, ids=None, where=None, limit=None, offset=None):
+        sql = f"SELECT {columns} FROM records WHERE collection = ?"
+        params = [self.name]
+        if ids is not None:
+            if not ids:
+                return sql + " AND 0", params
+            sql += f" AND id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        if where:
+            sql += " AND " + compile_where(where, params)
+        if limit is not None or offset:
+            sql += " ORDER BY rowid LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, offset or 0])
+        return sql, params
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None):
+        include = ["documents", "metadatas"] if include is None else include
+        sql, params = self._select("id, document, metadata", ids, where, limit, offset)
+        rows = self._client.connection().execute(sql, params).fetchall()
+        return {
+            "ids": [row[0] for row in rows],
+            "documents": [row[1] for row in rows] if "documents" in include else None,
+            "metadatas": [json.loads(row[2]) for row in rows] if "metadatas" in include else None,
+        }
+
+    def delete(self, ids=None, where=None):
+        sql, params = self._select("rowid", ids, where)
+        with self._client.connection() as conn:
+            conn.execute(f"DELETE FROM records WHERE rowid IN ({sql})", params)
+
+    def count(self):
+        return self._client.connection().execute(
+            "SELECT COUNT(*) FROM records WHERE collection = ?", (self.name,)
+        ).fetchone()[0]
+
+
+class SqliteClient:
+    """
+    Chroma-client stand-in storing every collection in one SQLite file.
+
+    Each thread gets its own connection; the file runs in WAL mode so
+    lookups don't wait on writers.
+    """
+
+    supports_query = SqliteCollection.supports_query
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self.connection() as conn:
+            conn.execute(_SCHEMA)
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_or_create_collection(self, name, metadata=None, **kwargs):
+        return SqliteCollection(self, name)
+
+    def get_collection(self, name, **kwargs):
+        return SqliteCollection(self, name)
+
+    def delete_collection(self, name):
+        with self.connection() as conn:
+            conn.execute("DELETE FROM records WHERE collection = ?", (name,))
+
+    def heartbeat(self):
+        self.connection().execute("SELECT 1")
+        return int(time.time() * 1e9)
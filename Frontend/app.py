@@ -1,12 +1,20 @@
 import sys
 import os
+import time
 import streamlit as st
 
 # Add root project directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from Agents.agent import AdmissionOfficer
-from Database.db import get_student_by_name, add_student_data, delete_student_by_name
+from Backend.client import BackendBusyError, BackendError, HelpdeskClient
+from Database.profile import StudentProfile, student_id_for
+
+# Messages re-rendered on every rerun; older ones live on in the backend's conversation memory
+SESSION_MESSAGE_LIMIT = int(os.getenv("SESSION_MESSAGE_LIMIT", "50"))
+
+# Minimum seconds between name autocomplete requests while the name is being edited
+NAME_SUGGEST_DEBOUNCE = float(os.getenv("NAME_SUGGEST_DEBOUNCE", "0.3"))
+NEW_STUDENT_CHOICE = "➕ None of these, register a new profile"
 
 # Page config
 st.set_page_config(page_title="🎓 Admission Helpdesk Chatbot", page_icon="🎓", layout="centered")
@@ -83,6 +91,83 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner=False)
+def get_backend():
+    # The agents, LLM and database live in the backend (python -m Backend.server);
+    # this process only renders, over keep-alive connections to BACKEND_URL
+    return HelpdeskClient()
+
+
+backend = get_backend()
+
+
+def fetch_profile(name):
+    try:
+        return backend.get_student(name)
+    except OSError as e:
+        st.error(f"⚠️ The helpdesk backend is unreachable ({e}). Please try again shortly.")
+        st.stop()
+    except BackendError as e:
+        # A 503 (or any other error) is not "no profile": don't offer to register the student again
+        st.error(f"⚠️ Couldn't load the profile right now ({e.message}). Please try again shortly.")
+        st.stop()
+
+
+def load_profile(name):
+    # Only ask the backend when the name changes or a form invalidated the cached profile
+    if st.session_state.get("profile_id") != student_id_for(name):
+        remember_profile(name, fetch_profile(name))
+    return st.session_state.profile
+
+
+def suggest_names(text):
+    # Debounced: one request per distinct text, at most one per window; suggestions are
+    # only ever shown for the text they were looked up for
+    state = st.session_state.setdefault("name_suggestions", {"text": None, "at": 0.0, "names": []})
+    if text != state["text"]:
+        wait = NAME_SUGGEST_DEBOUNCE - (time.monotonic() - state["at"])
+        if wait > 0:
+            # A newer edit reruns the script and cuts this wait short, so only the latest text is looked up
+            time.sleep(wait)
+        try:
+            names = backend.suggest_names(text)
+        except (OSError, BackendError):
+            names = []
+        state.update(text=text, at=time.monotonic(), names=names)
+    return state["names"]
+
+
+def choose_suggested_profile(name):
+    # Offer completions and near misses before registering, so a typo doesn't create a duplicate student
+    suggestions = [n for n in suggest_names(name) if student_id_for(n) != student_id_for(name)]
+    if not suggestions:
+        return None
+    choice = st.radio(
+        "🔎 Did you mean one of these students?",
+        [*suggestions, NEW_STUDENT_CHOICE],
+        index=None,
+        key=f"suggestion_{student_id_for(name)}"
+    )
+    if choice is None:
+        st.stop()
+    if choice == NEW_STUDENT_CHOICE:
+        return None
+    profile = fetch_profile(choice)
+    remember_profile(name, profile)
+    return profile
+
+
+def remember_profile(name, profile):
+    # Keyed by the name as typed, so a suggestion picked for it is reused on later reruns
+    st.session_state.profile = profile
+    st.session_state.profile_id = student_id_for(name)
+
+
+def forget_profile():
+    st.session_state.pop("profile", None)
+    st.session_state.pop("profile_id", None)
+
+
 st.title("🎓 Admission Officer Chatbot")
 st.markdown("Ask me anything about student admissions, documents, loans, and eligibility!")
 
@@ -92,21 +177,23 @@ student_name = st.text_input("👤 Enter your full name to load your profile:")
 student_profile = None
 
 if student_name:
-    student_profile = get_student_by_name(student_name)
+    student_profile = load_profile(student_name)
+    if student_profile is None:
+        student_profile = choose_suggested_profile(student_name)
 
-    if student_profile and isinstance(student_profile, dict):
-        st.success(f"Student profile loaded for **{student_profile['name']}**")
+    if isinstance(student_profile, StudentProfile):
+        st.success(f"Student profile loaded for **{student_profile.name}**")
 
         # Display profile
         st.markdown(f"""
         <div class="student-profile">
-            <strong>📄 Name:</strong> {student_profile['name']}<br>
-            <strong>🎓 Course Applied:</strong> {student_profile['course_applied']}<br>
-            <strong>📊 10th Marks:</strong> {student_profile['marks_10th']}%<br>
-            <strong>📊 12th Marks:</strong> {student_profile['marks_12th']}%<br>
-            <strong>📁 Documents:</strong> {", ".join(student_profile['documents_submitted'])}<br>
-            <strong>💰 Loan Requested:</strong> ₹{student_profile['loan_requested']}<br>
-            <strong>📄 Income Certificate:</strong> {"Yes" if student_profile['income_certificate'] else "No"}
+            <strong>📄 Name:</strong> {student_profile.name}<br>
+            <strong>🎓 Course Applied:</strong> {student_profile.course_applied}<br>
+            <strong>📊 10th Marks:</strong> {student_profile.marks_10th}%<br>
+            <strong>📊 12th Marks:</strong> {student_profile.marks_12th}%<br>
+            <strong>📁 Documents:</strong> {", ".join(student_profile.documents_submitted)}<br>
+            <strong>💰 Loan Requested:</strong> ₹{student_profile.loan_requested}<br>
+            <strong>📄 Income Certificate:</strong> {"Yes" if student_profile.income_certificate else "No"}
         </div>
         """, unsafe_allow_html=True)
 
@@ -116,37 +203,38 @@ if student_name:
         with col1:
             with st.expander("✏️ Edit Profile"):
                 with st.form("edit_student_form"):
-                    age = st.number_input("Age", value=int(student_profile["age"]), min_value=16, max_value=60, step=1)
-                    course = st.text_input("Course Applied", value=student_profile["course_applied"])
-                    marks_10 = st.number_input("10th Marks (%)", value=float(student_profile["marks_10th"]), min_value=0.0, max_value=100.0)
-                    marks_12 = st.number_input("12th Marks (%)", value=float(student_profile["marks_12th"]), min_value=0.0, max_value=100.0)
+                    age = st.number_input("Age", value=student_profile.age, min_value=16, max_value=60, step=1)
+                    course = st.text_input("Course Applied", value=student_profile.course_applied)
+                    marks_10 = st.number_input("10th Marks (%)", value=student_profile.marks_10th, min_value=0.0, max_value=100.0)
+                    marks_12 = st.number_input("12th Marks (%)", value=student_profile.marks_12th, min_value=0.0, max_value=100.0)
                     docs = st.multiselect(
                         "Documents Submitted",
                         ["Marksheet 10th", "Marksheet 12th", "Aadhar Card", "Photo", "Transfer Certificate"],
-                        default=student_profile["documents_submitted"]
+                        default=list(student_profile.documents_submitted)
                     )
-                    loan_amt = st.number_input("Loan Amount Requested (₹)", value=float(student_profile["loan_requested"]), min_value=0.0)
-                    income_cert = st.checkbox("Do you have an income certificate?", value=bool(student_profile["income_certificate"]))
+                    loan_amt = st.number_input("Loan Amount Requested (₹)", value=student_profile.loan_requested, min_value=0.0)
+                    income_cert = st.checkbox("Do you have an income certificate?", value=student_profile.income_certificate)
                     submit_edit = st.form_submit_button("Save Changes")
 
                     if submit_edit:
-                        updated_profile = {
-                            "name": student_profile["name"],
-                            "age": int(age),
-                            "course_applied": course,
-                            "marks_10th": float(marks_10),
-                            "marks_12th": float(marks_12),
-                            "documents_submitted": docs,
-                            "loan_requested": float(loan_amt),
-                            "income_certificate": income_cert
-                        }
-                        add_student_data(updated_profile)
+                        updated_profile = student_profile.replace(
+                            age=age,
+                            course_applied=course,
+                            marks_10th=marks_10,
+                            marks_12th=marks_12,
+                            documents_submitted=docs,
+                            loan_requested=loan_amt,
+                            income_certificate=income_cert
+                        )
+                        backend.save_student(updated_profile)
+                        remember_profile(student_name, updated_profile)
                         st.success("✅ Profile updated successfully.")
                         st.rerun()
 
         with col2:
             if st.button("🗑️ Delete Profile"):
-                delete_student_by_name(student_profile["name"])
+                backend.delete_student(student_profile.name)
+                forget_profile()
                 st.success("🗑️ Profile deleted. Please refresh.")
                 st.stop()
 
@@ -167,7 +255,7 @@ if student_name:
                 if not (course and docs and marks_10 and marks_12):
                     st.error("❌ Please fill all required fields.")
                 else:
-                    student_profile = {
+                    student_profile = StudentProfile.from_dict({
                         "name": name,
                         "age": age,
                         "course_applied": course,
@@ -176,18 +264,17 @@ if student_name:
                         "documents_submitted": docs,
                         "loan_requested": loan_amt,
                         "income_certificate": income_cert
-                    }
-                    add_student_data(student_profile)
+                    })
+                    backend.save_student(student_profile)
+                    remember_profile(student_name, student_profile)
                     st.success("✅ Student profile created and stored in ChromaDB.")
                     st.rerun()
 
 # Start chatbot if profile is available
-if student_profile and isinstance(student_profile, dict):
+if isinstance(student_profile, StudentProfile):
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
-    officer = AdmissionOfficer()
-
     # Chat history
     for msg in st.session_state.messages:
         with st.chat_message(msg["role"]):
@@ -200,15 +287,22 @@ if student_profile and isinstance(student_profile, dict):
         st.chat_message("user").markdown(f"🧑‍🎓 {query}")
         st.session_state.messages.append({"role": "user", "content": query})
 
+        def stream_reply():
+            yield "🎓 "
+            yield from backend.chat_stream(query, student_profile)
+
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
-                    response = officer.process_query(query, student_profile)
-                    st.markdown(f"🎓 {response}")
+            try:
+                # Render tokens as they arrive instead of waiting for the full answer
+                response = st.write_stream(stream_reply()).removeprefix("🎓 ")
+                if response.strip():
                     st.session_state.messages.append({"role": "assistant", "content": response})
-                except Exception as e:
-                    st.error("⚠️ Error processing query. Please try again.")
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": f"Sorry, something went wrong: {str(e)}"
-                    })
+            except BackendBusyError:
+                st.warning("⏳ The helpdesk is handling a lot of questions right now. Please try again in a minute.")
+            except Exception as e:
+                st.error("⚠️ Error processing query. Please try again.")
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": f"Sorry, something went wrong: {str(e)}"
+                })
+        del st.session_state.messages[:-SESSION_MESSAGE_LIMIT]
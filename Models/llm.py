@@ -1,25 +1,447 @@
-from crewai import LLM
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 
-def get_ollama_model(model_name: str = "llama3"):
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+# Comma-separated Ollama servers to spread calls over; defaults to OLLAMA_BASE_URL alone
+OLLAMA_ENDPOINTS = [url.strip() for url in os.getenv("OLLAMA_ENDPOINTS", OLLAMA_BASE_URL).split(",") if url.strip()]
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_STREAM_TIMEOUT = float(os.getenv("OLLAMA_STREAM_TIMEOUT", "120"))
+# How long Ollama keeps the model loaded after a request
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Backpressure for the Ollama servers: calls beyond the limit (per endpoint) wait up to the queue timeout
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+OLLAMA_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "60"))
+
+# Endpoint health: consecutive failures before ejection, seconds before it is tried again,
+# and how often the background checker polls (0 disables it)
+OLLAMA_EJECT_AFTER = int(os.getenv("OLLAMA_EJECT_AFTER", "3"))
+OLLAMA_EJECT_SECONDS = float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "15"))
+OLLAMA_HEALTH_TIMEOUT = float(os.getenv("OLLAMA_HEALTH_TIMEOUT", "3"))
+
+logger = logging.getLogger(__name__)
+
+def get_ollama_model(model_name: str = OLLAMA_MODEL, base_url: str = OLLAMA_BASE_URL):
     """
     Initializes and returns a CrewAI-compatible Ollama LLM.
 
     Parameters:
         model_name (str): The name of the model to use (default: "llama3")
+        base_url (str): The Ollama server to talk to
 
     Returns:
         LLM: A CrewAI-compatible LLM instance with Ollama provider
     """
+    # Imported here so that loading this module doesn't pull in crewai
+    from crewai import LLM
+
     return LLM(
         model=f"ollama/{model_name}",  # e.g., "ollama/llama3"
         provider="ollama",             # Important: tells CrewAI to use Ollama provider
-        base_url="http://localhost:11434",  # Default base URL for Ollama server
+        base_url=base_url,
         temperature=0.7,
         max_tokens=512
     )
 
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+def count_tokens(text: str) -> int:
+    """
+    Approximates the number of LLM tokens in text (words plus punctuation marks).
+
+    Close enough to Llama's tokenizer for budgeting and metrics without loading it.
+    """
+    return len(_TOKEN_RE.findall(text)) if text else 0
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text down to at most max_tokens tokens (as counted by count_tokens)."""
+    if max_tokens <= 0:
+        return ""
+    for i, match in enumerate(_TOKEN_RE.finditer(text)):
+        if i == max_tokens:
+            return text[:match.start()].rstrip()
+    return text
+
+def stream_ollama(prompt: str, model_name: str = OLLAMA_MODEL, base_url: str = OLLAMA_BASE_URL,
+                  temperature: float = 0.7, max_tokens: int = 512, timeout: float = OLLAMA_STREAM_TIMEOUT):
+    """
+    Streams a completion from Ollama's /api/generate endpoint.
+
+    Parameters:
+        prompt (str): The full prompt to send
+        model_name (str): The name of the model to use (default: "llama3")
+
+    Yields:
+        str: Response tokens as Ollama produces them
+    """
+    payload = json.dumps({
+        "model": model_name,
+        "prompt": prompt,
+        "stream": True,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {"temperature": temperature, "num_predict": max_tokens},
+    }).encode("utf-8")
+    request = urllib.request.Request(
+        f"{base_url.rstrip('/')}/api/generate",
+        data=payload,
+        headers={"Content-Type": "application/json"},
+    )
+    # Ollama sends one JSON object per line until "done" is true
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        for line in response:
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise RuntimeError(f"Ollama error: {chunk['error']}")
+            token = chunk.get("response")
+            if token:
+                yield token
+            if chunk.get("done"):
+                break
+
+class LLMBusyError(TimeoutError):
+    """Raised when no LLM slot frees up within the queue timeout."""
+
+
+class LLMConcurrencyLimiter:
+    """
+    Caps the number of in-flight LLM calls across threads and event loops.
+
+    Synchronous callers block on `slot()`; async callers await `aslot()`,
+    which waits without blocking the event loop. Either raises LLMBusyError
+    if no slot frees up within `queue_timeout` seconds.
+    """
+
+    def __init__(self, max_in_flight=OLLAMA_MAX_CONCURRENCY, queue_timeout=OLLAMA_QUEUE_TIMEOUT,
+                 poll_interval=0.02):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def _acquired(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _rejected(self):
+        with self._lock:
+            self.rejected += 1
+        raise LLMBusyError(f"LLM busy: no slot free after {self.queue_timeout}s")
+
+    @contextmanager
+    def slot(self, timeout=None):
+        timeout = self.queue_timeout if timeout is None else timeout
+        with self._lock:
+            self.waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            self._rejected()
+        self._acquired()
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self, timeout=None):
+        timeout = self.queue_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self.waiting += 1
+        try:
+            # Poll instead of parking a worker thread on the semaphore for every queued call
+            while not self._slots.acquire(blocking=False):
+                if time.monotonic() >= deadline:
+                    self._rejected()
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        self._acquired()
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "rejected": self.rejected,
+            }
+
+
+# Shared by every caller in the process, since they all talk to the same Ollama servers
+llm_limiter = LLMConcurrencyLimiter(OLLAMA_MAX_CONCURRENCY * len(OLLAMA_ENDPOINTS))
+
+
+def _post_json(url, payload, timeout):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read() or b"{}")
+
+
+class OllamaEndpoint:
+    """One Ollama server in a pool, with its load and latency figures."""
+
+    # Weight of the newest call in the moving latency average
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, url, model_name=OLLAMA_MODEL):
+        self.url = url.rstrip("/")
+        self.model_name = model_name
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ewma_seconds = None
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._llm = None
+        self._llm_lock = threading.Lock()
+
+    def llm(self):
+        # Built once per endpoint and reused, rather than per call
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    self._llm = get_ollama_model(self.model_name, base_url=self.url)
+        return self._llm
+
+    def available(self, now):
+        return self.ejected_until <= now
+
+    def stats(self, now):
+        return {
+            "url": self.url,
+            "healthy": self.available(now),
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_ms": round(self.total_seconds / (self.calls - self.errors) * 1000, 1) if self.calls > self.errors else None,
+            "ewma_ms": round(self.ewma_seconds * 1000, 1) if self.ewma_seconds is not None else None,
+            "max_ms": round(self.max_seconds * 1000, 1),
+        }
+
+
+class OllamaPool:
+    """
+    Routes LLM calls over several Ollama endpoints.
+
+    Each call goes to the available endpoint with the fewest outstanding
+    requests (ties broken by recent latency). An endpoint that fails
+    `eject_after` times in a row is ejected for `eject_seconds`; the health
+    checker, or the first call after that, re-admits it once it answers.
+    `call()` has the CrewAI LLM signature, so a pool can stand in wherever
+    the shared LLM is used for a direct call.
+    """
+
+    def __init__(self, endpoints=OLLAMA_ENDPOINTS, model_name=OLLAMA_MODEL, eject_after=OLLAMA_EJECT_AFTER,
+                 eject_seconds=OLLAMA_EJECT_SECONDS, health_timeout=OLLAMA_HEALTH_TIMEOUT):
+        if not endpoints:
+            raise ValueError("an Ollama pool needs at least one endpoint")
+        self.model_name = model_name
+        self.endpoints = [OllamaEndpoint(url, model_name) for url in endpoints]
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.health_timeout = health_timeout
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    def _pick(self, exclude=()):
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.available(now) and e not in exclude]
+            if not candidates:
+                # Everything is ejected: try whichever comes back soonest rather than fail outright
+                candidates = sorted((e for e in self.endpoints if e not in exclude), key=lambda e: e.ejected_until)[:1]
+            if not candidates:
+                return None
+            endpoint = min(candidates, key=lambda e: (e.in_flight, e.ewma_seconds or 0.0))
+            endpoint.in_flight += 1
+            return endpoint
+
+    def _finish(self, endpoint, seconds, failed):
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.calls += 1
+            if failed:
+                endpoint.errors += 1
+                self._failed(endpoint)
+                return
+            endpoint.consecutive_failures = 0
+            endpoint.ejected_until = 0.0
+            endpoint.total_seconds += seconds
+            endpoint.max_seconds = max(endpoint.max_seconds, seconds)
+            alpha = OllamaEndpoint.EWMA_ALPHA
+            endpoint.ewma_seconds = seconds if endpoint.ewma_seconds is None else (
+                alpha * seconds + (1 - alpha) * endpoint.ewma_seconds
+            )
+
+    def _failed(self, endpoint):
+        # Caller holds self._lock
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= self.eject_after:
+            if endpoint.available(time.monotonic()):
+                logger.warning(f"[OLLAMA] Ejecting {endpoint.url} after {endpoint.consecutive_failures} failures")
+            endpoint.ejected_until = time.monotonic() + self.eject_seconds
+
+    @contextmanager
+    def lease(self, exclude=()):
+        """Reserves the least loaded endpoint for the duration of the block."""
+        endpoint = self._pick(exclude)
+        if endpoint is None:
+            raise ConnectionError("no Ollama endpoint left to try")
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield endpoint
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._finish(endpoint, time.perf_counter() - started, failed)
+
+    def call(self, prompt, **kwargs):
+        """Completes `prompt` on the least loaded endpoint, retrying once elsewhere on failure."""
+        tried = []
+        while True:
+            try:
+                with self.lease(exclude=tried) as endpoint:
+                    return endpoint.llm().call(prompt, **kwargs)
+            except Exception as e:
+                tried.append(endpoint)
+                if len(tried) >= min(2, len(self.endpoints)):
+                    raise
+                logger.warning(f"[OLLAMA] {endpoint.url} failed ({e}), retrying on another endpoint")
+
+    def stream(self, prompt, **kwargs):
+        """Streams `prompt` from the least loaded endpoint; a failure before the first token is retried elsewhere."""
+        tried = []
+        while True:
+            started = False
+            try:
+                with self.lease(exclude=tried) as endpoint:
+                    for token in stream_ollama(prompt, model_name=self.model_name, base_url=endpoint.url, **kwargs):
+                        started = True
+                        yield token
+                return
+            except Exception as e:
+                tried.append(endpoint)
+                if started or len(tried) >= min(2, len(self.endpoints)):
+                    raise
+                logger.warning(f"[OLLAMA] {endpoint.url} failed ({e}), retrying on another endpoint")
+
+    def check_endpoint(self, endpoint):
+        try:
+            with urllib.request.urlopen(f"{endpoint.url}/api/version", timeout=self.health_timeout):
+                pass
+        except Exception as e:
+            with self._lock:
+                self._failed(endpoint)
+            logger.debug(f"[OLLAMA] Health check failed for {endpoint.url}: {e}")
+            return False
+        with self._lock:
+            if not endpoint.available(time.monotonic()):
+                logger.info(f"[OLLAMA] Re-admitting {endpoint.url}")
+            endpoint.consecutive_failures = 0
+            endpoint.ejected_until = 0.0
+        return True
+
+    def check_health(self):
+        """Polls every endpoint once; returns {url: healthy}."""
+        return {endpoint.url: self.check_endpoint(endpoint) for endpoint in self.endpoints}
+
+    def start_health_checks(self, interval=OLLAMA_HEALTH_INTERVAL):
+        if interval <= 0 or self._health_thread is not None:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(interval)
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=_loop, name="ollama-health", daemon=True)
+        self._health_thread.start()
+
+    def warm_endpoint(self, endpoint):
+        # An empty prompt makes Ollama load the model and keep it resident for OLLAMA_KEEP_ALIVE
+        started = time.perf_counter()
+        try:
+            _post_json(
+                f"{endpoint.url}/api/generate",
+                {"model": self.model_name, "prompt": "", "stream": False, "keep_alive": OLLAMA_KEEP_ALIVE},
+                timeout=OLLAMA_STREAM_TIMEOUT,
+            )
+        except Exception as e:
+            logger.warning(f"[OLLAMA] Warm-up failed for {endpoint.url}: {e}")
+            with self._lock:
+                self._failed(endpoint)
+            return False
+        logger.info(f"[OLLAMA] {self.model_name} loaded on {endpoint.url} in {time.perf_counter() - started:.1f}s")
+        return True
+
+    def warm_up(self, wait=True):
+        """Loads the model on every endpoint in parallel; with wait=False returns at once."""
+        executor = ThreadPoolExecutor(max_workers=len(self.endpoints), thread_name_prefix="ollama-warm-up")
+        futures = [executor.submit(self.warm_endpoint, endpoint) for endpoint in self.endpoints]
+        executor.shutdown(wait=False)
+        if wait:
+            return {endpoint.url: future.result() for endpoint, future in zip(self.endpoints, futures)}
+        return None
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [endpoint.stats(now) for endpoint in self.endpoints]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_ollama_pool():
+    """The process-wide pool over OLLAMA_ENDPOINTS, created (and its health checker started) on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = OllamaPool()
+                pool.start_health_checks()
+                _pool = pool
+    return _pool
+
 # Optional test
 if __name__ == "__main__":
-    model = get_ollama_model()
+    model = get_ollama_pool()
     result = model.call("List the required documents for student admission.")
     print("\n\nModel Response:\n", result)
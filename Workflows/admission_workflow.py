@@ -0,0 +1,172 @@
+import argparse
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from Agents.documents import DOCUMENT_LABELS
+from Agents.rules import MIN_MARKS
+from Database.profile import StudentProfile
+
+SCREENING_PAGE_SIZE = int(os.getenv("SCREENING_PAGE_SIZE", "2000"))
+SCREENING_WORKERS = int(os.getenv("SCREENING_WORKERS", str(os.cpu_count() or 1)))
+
+RESULT_FIELDS = [
+    "student_id",
+    "name",
+    "course_applied",
+    "marks_10th",
+    "marks_12th",
+    "marks_ok",
+    "documents_complete",
+    "missing_documents",
+    "admission_status",
+    "loan_requested",
+    "loan_eligible",
+    "loan_issues",
+]
+
+SUMMARY_FIELDS = ["screened", "failed", "marks_ok", "documents_complete", "loan_eligible"]
+
+
+def screen_batch(metadatas):
+    """
+    Applies the admission, document and loan rules to one page of stored profiles.
+
+    Verdicts come from each profile's stored snapshot (StudentProfile.eligibility),
+    so batch screening and chat always agree; profiles saved under an older rule
+    set are evaluated through Agents.rules instead.
+
+    Returns:
+        tuple: (result rows, summary counts, [{"id", "error"}] for undecodable records)
+    """
+    profiles = []
+    failed = []
+    for metadata in metadatas:
+        try:
+            profiles.append(StudentProfile.from_metadata(metadata))
+        except Exception as e:
+            failed.append({"id": metadata.get("name"), "error": str(e)})
+
+    counts = dict.fromkeys(SUMMARY_FIELDS, 0)
+    counts["failed"] = len(failed)
+
+    rows = []
+    for profile in profiles:
+        eligibility = profile.eligibility
+        missing = [DOCUMENT_LABELS[doc] for doc in eligibility.missing_documents]
+        issues = []
+        if not profile.income_certificate:
+            issues.append("income certificate not submitted")
+        if not eligibility.marks_10th_ok:
+            issues.append(f"10th marks are below {MIN_MARKS}%")
+        if not eligibility.marks_12th_ok:
+            issues.append(f"12th marks are below {MIN_MARKS}%")
+        if missing:
+            issues.append("missing documents: " + ", ".join(missing))
+        rows.append({
+            "student_id": profile.student_id,
+            "name": profile.name,
+            "course_applied": profile.course_applied,
+            "marks_10th": profile.marks_10th,
+            "marks_12th": profile.marks_12th,
+            "marks_ok": eligibility.marks_ok,
+            "documents_complete": eligibility.documents_complete,
+            "missing_documents": "; ".join(missing),
+            "admission_status": "approved" if eligibility.documents_complete else "not approved",
+            "loan_requested": profile.loan_requested,
+            "loan_eligible": eligibility.loan_eligible,
+            "loan_issues": "; ".join(issues),
+        })
+        counts["marks_ok"] += eligibility.marks_ok
+        counts["documents_complete"] += eligibility.documents_complete
+        counts["loan_eligible"] += eligibility.loan_eligible
+
+    counts["screened"] = len(profiles)
+    return rows, counts, failed
+
+
+def _screen_pages(pages, workers):
+    # Keep a bounded number of pages in flight so the cohort is never held in memory at once
+    if workers <= 1:
+        for page in pages:
+            yield screen_batch(page)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for page in pages:
+            pending.append(pool.submit(screen_batch, page))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _ResultWriter:
+    def __init__(self, path):
+        self.jsonl = path.lower().endswith(".jsonl")
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        if not self.jsonl:
+            self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, rows):
+        if self.jsonl:
+            self._file.writelines(json.dumps(row) + "\n" for row in rows)
+        else:
+            self._csv.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+def run_screening(output_path, pages=None, page_size=SCREENING_PAGE_SIZE, workers=SCREENING_WORKERS):
+    """
+    Screens every student profile and writes one result row per student.
+
+    `pages` defaults to streaming the students collection page by page; any
+    iterable of metadata-dict lists works. Results go to `output_path` (CSV,
+    or JSON lines for a .jsonl path) and the summary counts to
+    `<output_path stem>_summary.json`.
+
+    Returns:
+        dict: {"screened", "failed", "marks_ok", "documents_complete", "loan_eligible", "errors"}
+    """
+    if pages is None:
+        from Database.db import iter_student_pages
+        pages = iter_student_pages(page_size)
+
+    summary = dict.fromkeys(SUMMARY_FIELDS, 0)
+    summary["errors"] = []
+    writer = _ResultWriter(output_path)
+    try:
+        for rows, counts, failed in _screen_pages(pages, workers):
+            writer.write(rows)
+            for field in SUMMARY_FIELDS:
+                summary[field] += counts[field]
+            summary["errors"].extend(failed)
+    finally:
+        writer.close()
+
+    summary_path = os.path.splitext(output_path)[0] + "_summary.json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print(
+        f"✅ Screened {summary['screened']} students: {summary['documents_complete']} documents complete, "
+        f"{summary['marks_ok']} meet marks criteria, {summary['loan_eligible']} loan eligible, "
+        f"{summary['failed']} failed"
+    )
+    return summary
+
+
+# Screen the whole cohort: python -m Workflows.admission_workflow results.csv
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch admission screening over the students collection")
+    parser.add_argument("output", help="results file (.csv or .jsonl)")
+    parser.add_argument("--page-size", type=int, default=SCREENING_PAGE_SIZE)
+    parser.add_argument("--workers", type=int, default=SCREENING_WORKERS)
+    args = parser.parse_args()
+    run_screening(args.output, page_size=args.page_size, workers=args.workers)